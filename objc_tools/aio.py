@@ -0,0 +1,87 @@
+__doc__ = '''asyncio support for ObjC APIs that report back through a completion handler
+>>> from objc_tools import aio
+>>> settings = await aio.call(center.getNotificationSettingsWithCompletionHandler_)
+'''
+import asyncio
+from objc_util import ObjCBlock, c_void_p
+
+# Completions whose block hasn't been called yet, ObjC only holds a weak
+# pointer to the block so it has to be kept alive here. Timing out or
+# cancelling doesn't remove one since ObjC may still call the block, a
+# handler that never fires keeps its Completion here until release()
+_pending = set()
+
+
+class Completion (object):
+    '''A completion handler that resolves an asyncio future
+    Pass .block as the completion handler and await the Completion. The
+    handler can be called on any thread, the future is resolved on the loop
+    with call_soon_threadsafe. It resolves to the argument the handler was
+    called with, or a tuple of them if there are several.
+    argtypes: the block's argument types, the first one is the block itself
+    The Completion is kept alive until the handler is called, even if the
+    caller stops waiting. Call release() once the ObjC side is known to be
+    done with the block without calling it, e.g. after cancelling the request.
+    '''
+    def __init__(self, argtypes=[c_void_p, c_void_p], restype=None, loop=None):
+        self.loop = loop or asyncio.get_event_loop()
+        self.future = self.loop.create_future()
+        self.block = ObjCBlock(self.handler, argtypes=argtypes, restype=restype)
+        _pending.add(self)
+
+    def __await__(self):
+        return self.future.__await__()
+
+    def release(self):
+        '''Stops keeping the block alive and cancels the future if it is still waiting
+        Only safe once ObjC will no longer call the block.
+        '''
+        _pending.discard(self)
+        if not self.future.done() and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._cancel)
+
+    def _cancel(self):
+        if not self.future.done():
+            self.future.cancel()
+
+    def handler(self, _cmd, *args):
+        _pending.discard(self)
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._resolve, args[0] if len(args) == 1 else args)
+
+    def _resolve(self, result):
+        # The future is already done if the caller timed out or was cancelled
+        if not self.future.done():
+            self.future.set_result(result)
+
+
+async def call(method, *args, argtypes=[c_void_p, c_void_p], timeout=None, loop=None):
+    '''Calls method with args and a completion handler, then waits for the handler
+    The handler is passed as the last argument so this works for ObjC methods
+    and C functions alike.
+    timeout: seconds to wait before raising asyncio.TimeoutError, the block
+        stays alive in case ObjC calls it later
+    '''
+    completion = Completion(argtypes, loop=loop)
+    try:
+        method(*(args + (completion.block,)))
+    except BaseException:
+        # The block never reached ObjC so nothing will call it
+        _pending.discard(completion)
+        raise
+    return await asyncio.wait_for(completion.future, timeout)
+
+
+async def gather(*aws, limit=None, return_exceptions=False):
+    '''Like asyncio.gather but only runs limit of the awaitables at a time
+    Coroutines from call() don't make their ObjC call until they are run, so
+    limit bounds how many calls are in flight.
+    '''
+    if limit:
+        semaphore = asyncio.Semaphore(limit)
+
+        async def bounded(aw):
+            async with semaphore:
+                return await aw
+        aws = [bounded(aw) for aw in aws]
+    return await asyncio.gather(*aws, return_exceptions=return_exceptions)
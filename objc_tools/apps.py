@@ -1,8 +1,17 @@
-from objc_util import ObjCClass, nsurl, ObjCInstance, uiimage_to_png, UIImage
+from objc_util import ObjCClass, nsurl, ObjCInstance, uiimage_to_png, UIImage, create_objc_class
 from datetime import datetime
 from io import BytesIO
+from os import path as os_path, makedirs, sep as os_sep, replace as os_replace
+from time import time
+from collections import namedtuple
+from hashlib import sha1
+import json
+from array import array
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from threading import get_ident
 from PIL import Image
-from objc_tools.objc_json import objc_to_py
+from objc_tools.objc_json import objc_to_native
 from objc_tools.backports.enum_backport import IntEnum
 
 LSApplicationWorkspace = ObjCClass('LSApplicationWorkspace')
@@ -16,112 +25,155 @@ class AppType (IntEnum):
     System = 1
     User = 0
     
+class _memoized (object):
+    '''A property that is computed on first access and then kept in a slot'''
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+        self.slot = None
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return self.slot.__get__(instance, owner)
+        except AttributeError:
+            value = self.func(instance)
+            self.slot.__set__(instance, value)
+            return value
+
+
 class App (object):
+    '''Wraps an LSApplicationProxy
+    Properties only go over the bridge the first time they are read, use
+    prefetch() to load several of them at once.
+    '''
+    fields = ('hidden', 'modTime', 'iPhoneUI', 'iPadUI', 'isBeta', 'isRedownload',
+              'name', 'type', 'version', 'versionString', 'fileSharing',
+              'hasSettingsBundle', 'backgroundModes', 'vendor', 'appID',
+              'adHoc', 'sdkVersion', 'entitlements', 'bundlePath',
+              'containerPath', 'reciptPath', 'dataContainerPath', 'teamID',
+              'variant', 'minimumOsVersion', 'signerID', 'urlSchemes')
+    __slots__ = ('objc', 'infoPlist', 'staticDisk', 'dynamicDisk', 'icon', 'schemes') + tuple('_' + name for name in fields)
+
     def __init__(self, app):
         try:
-            app.applicationIdentifier()
+            appID = app.applicationIdentifier()
         except AttributeError:
             raise AttributeError('{0} is not an app ObjC Class'.format(app))
-        bg = []
         self.objc = app
-        if len(self.objc.appTags()):
-            for i in app.appTags():
-                if i == 'hidden':
-                    self.hidden = True
-        else:
-            self.hidden = False
-        self.modTime = datetime.fromtimestamp(self.objc.bundleModTime()+_timediff)
-        try:
-            dfam = [i.intValue() for i in self.objc.deviceFamily()]
-        except:
-            dfam = []
-        self.iPhoneUI = 1 in dfam
-        self.iPadUI = 2 in dfam
+        self._appID = str(appID)
         self.infoPlist = None
         self.staticDisk = None
         self.dynamicDisk = None
         self.icon = None
+
+    def prefetch(self, fields=None):
+        '''Loads the given fields (all of them by default) in one go'''
+        for name in fields or self.fields:
+            if name not in self.fields:
+                raise ValueError('{} is not an app field'.format(name))
+            getattr(self, name)
+        return self
+
+    @_memoized
+    def hidden(self):
+        return 'hidden' in [str(i) for i in self.objc.appTags()]
+
+    @_memoized
+    def modTime(self):
+        return datetime.fromtimestamp(self.objc.bundleModTime()+_timediff)
+
+    def _deviceFamily(self):
+        try:
+            return [i.intValue() for i in self.objc.deviceFamily()]
+        except:
+            return []
+
+    @_memoized
+    def iPhoneUI(self):
+        return 1 in self._deviceFamily()
+
+    @_memoized
+    def iPadUI(self):
+        return 2 in self._deviceFamily()
         
-    @property
+    @_memoized
     def isBeta(self):
         return self.objc.isBetaApp()
         
-    @property
+    @_memoized
     def isRedownload(self):
         return self.objc.isPurchasedReDownload()
         
-    @property
+    @_memoized
     def name(self):
         return str(self.objc.localizedName())
         
-    @property
+    @_memoized
     def type(self):
         return AppType[str(self.objc.bundleType())]
         
-    @property
+    @_memoized
     def version(self):
         return str(self.objc.bundleVersion())
         
-    @property
+    @_memoized
     def versionString(self):
         return str(self.objc.shortVersionString())
         
-    @property
+    @_memoized
     def fileSharing(self):
         return self.objc.fileSharingEnabled()
         
-    @property
+    @_memoized
     def hasSettingsBundle(self):
         return self.objc.hasSettingsBundle()
         
-    @property
+    @_memoized
     def backgroundModes(self):
-        return [str(mode) for mode in self.objc.UIBackgroundModes()]
+        return [str(mode) for mode in self.objc.UIBackgroundModes() or []]
 
-    @property
+    @_memoized
     def vendor(self):
         return str(self.objc.vendorName())
     
-    @property
+    @_memoized
     def appID(self):
         return str(self.objc.applicationIdentifier())
         
-    @property
-    def signerID(self):
-        return str(self.objc.signerIdentity())
-        
-    @property
+    @_memoized
     def adHoc(self):
         return self.objc.isAdHocCodeSigned()
         
-    @property
+    @_memoized
     def sdkVersion(self):
         return str(self.objc.sdkVersion())
         
-    @property
+    @_memoized
     def entitlements(self):
         try:
-            return objc_to_py(self.objc.entitlements())
+            return objc_to_native(self.objc.entitlements())
         except TypeError:
             return None
     
-    @property
+    @_memoized
     def bundlePath(self):
         return str(self.objc.bundleURL()).replace('file://', '')
         
-    @property
+    @_memoized
     def containerPath(self):
         return str(self.objc.bundleContainerURL()).replace('file://', '')
         
-    @property
+    @_memoized
     def reciptPath(self):
         return str(self.objc.appStoreReceiptURL()).replace('file://', '')
         
-    @property
+    @_memoized
     def dataContainerPath(self):
         return str(self.objc.dataContainerURL()).replace('file://', '')
         
-    @property
+    @_memoized
     def teamID(self):
         return str(self.objc.teamID())
         
@@ -133,15 +185,25 @@ class App (object):
         else:
             return None
             
-    @property
+    @_memoized
     def variant(self):
         return str(self.objc.applicationVariant())
-    
-    @property
+
+    @_memoized
+    def urlSchemes(self):
+        '''The URL schemes declared in the app's Info.plist'''
+        urltypes = self.objc._infoDictionary().propertyList().objectForKey_('CFBundleURLTypes')
+        schemes = []
+        for urltype in urltypes or []:
+            for scheme in urltype.objectForKey_('CFBundleURLSchemes') or []:
+                schemes += [str(scheme)]
+        return schemes
+
+    @_memoized
     def minimumOsVersion(self):
         return self.objc.minimumSystemVersion()
         
-    @property
+    @_memoized
     def signerID(self):
         if self.objc.signerIdentity():
             return str(self.objc.signerIdentity())
@@ -150,12 +212,8 @@ class App (object):
     
     
     def enumURLSchemes(self):
-        returns = []
-        for i in [str(i) for i in workspace.publicURLSchemes()]:
-            app = workspace.applicationForOpeningResource_(_urlHandle(i+'://'))
-            if str(app.applicationIdentifier()) == self.appID:
-                returns += [i]
-            self.schemes = returns
+        '''Sets the schemes the app opens or declares, from the shared scheme index'''
+        self.schemes = schemeIndex.schemesForApp(self)
             
     def getDiskUsage(self):
         """Set's the static and dynamic disk usage variables"""
@@ -169,12 +227,8 @@ class App (object):
         self.infoPlist = self.objc._infoDictionary().propertyList()
         
     def getIcon(self, scale=2.0, form=10):
-
-        i = UIImage._applicationIconImageForBundleIdentifier_format_scale_(self.appID, form, scale)
-        o = ObjCInstance(i.akCGImage())
-        img = UIImage.imageWithCGImage_(o)
-        with BytesIO(uiimage_to_png(img)) as buffer:
-            self.icon = Image.open(buffer)
+        '''Sets the icon attribute to a PIL image of the app's icon'''
+        self.icon = _loadPNG(_iconPNG(self.appID, scale, form))
 
     def __str__(self):
         return self.appID
@@ -183,11 +237,257 @@ class App (object):
         return '<' + self.appID + '>'
 
 
-def _objcDict(objcd):
-    returns = []
-    for i in zip(objcd.allKeys(), objcd.allValues()):
-        returns += [{i[0]: i[1]}]
-    return returns
+for _name, _value in list(App.__dict__.items()):
+    if isinstance(_value, _memoized):
+        _value.slot = App.__dict__['_' + _name]
+del _name, _value
+
+
+def prefetch(apps, fields=None, workers=None):
+    '''Loads fields (all of them by default) for many apps in one pass
+    workers: load the apps on a thread pool of this size
+    Returns the apps as a list
+    '''
+    apps = list(apps)
+    if workers:
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(lambda app: app.prefetch(fields), apps))
+    else:
+        for app in apps:
+            app.prefetch(fields)
+    return apps
+
+
+def _iconPNG(bid, scale=2.0, form=10):
+    i = UIImage._applicationIconImageForBundleIdentifier_format_scale_(bid, form, scale)
+    o = ObjCInstance(i.akCGImage())
+    img = UIImage.imageWithCGImage_(o)
+    return uiimage_to_png(img)
+
+
+def _loadPNG(data):
+    with BytesIO(data) as buffer:
+        image = Image.open(buffer)
+        # PIL reads lazily so it has to finish before the buffer closes
+        image.load()
+    return image
+
+
+def _writeAtomic(path, data):
+    '''Writes the bytes to path through a temp file, so an interrupted write never leaves a partial file'''
+    temp = '{}.{}.tmp'.format(path, get_ident())
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os_replace(temp, path)
+
+
+IconExport = namedtuple('IconExport', ['icons', 'rendered', 'cached', 'seconds'])
+
+
+def export_icons(apps, scale=2.0, form=10, workers=4, directory=None, renderer=None):
+    '''Renders the icons for many apps concurrently, caching the PNGs on disk
+    Cached icons are keyed by bundle ID, version, scale and format so they are
+    rendered again after an update.
+    directory: where the PNGs are kept, defaults to .icon_cache in Documents
+    renderer: a callable(bid, scale, form) returning PNG bytes, defaults to rendering with UIImage
+    Returns an IconExport with a dict of bundle ID: loaded PIL image, how many
+    icons were rendered and read from the cache and the seconds it took
+    '''
+    if directory is None:
+        directory = os_path.join(os_path.expanduser('~/Documents'), '.icon_cache')
+    renderer = renderer or _iconPNG
+    makedirs(directory, exist_ok=True)
+    start = time()
+
+    def load(app):
+        name = '{}_{}_{}x_{}.png'.format(app.appID, app.version, scale, form).replace(os_sep, '_')
+        path = os_path.join(directory, name)
+        if os_path.exists(path):
+            with open(path, 'rb') as f:
+                return app.appID, _loadPNG(f.read()), True
+        data = renderer(app.appID, scale, form)
+        _writeAtomic(path, data)
+        return app.appID, _loadPNG(data), False
+
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(load, apps))
+    cached = sum(1 for bid, image, hit in results if hit)
+    return IconExport({bid: image for bid, image, hit in results}, len(results) - cached, cached, time() - start)
+
+
+def _usage(number):
+    return number.integerValue() if number else 0
+
+
+class DiskReport (object):
+    '''Disk usage for many apps as parallel arrays, largest total first
+    growth is the change in total usage since the previous report, apps that
+    weren't in it are listed in new and count their whole usage as growth.
+    Without a previous report there is no growth and nothing is new.
+    complete: rows cover every app, so apps only in previous were removed
+    '''
+    def __init__(self, rows, previous=None, since=None, complete=True):
+        self.since = since
+        self.bundleIDs = [bid for bid, static, dynamic in rows]
+        self.static = array('q', (static for bid, static, dynamic in rows))
+        self.dynamic = array('q', (dynamic for bid, static, dynamic in rows))
+        self.total = array('q', (static + dynamic for bid, static, dynamic in rows))
+        if previous is None:
+            self.growth = array('q', bytes(8 * len(rows)))
+            self.new = []
+            self.removed = []
+            return
+        self.growth = array('q', (total - sum(previous.get(bid, (0, 0)))
+                                  for bid, total in zip(self.bundleIDs, self.total)))
+        self.new = [bid for bid in self.bundleIDs if bid not in previous]
+        self.removed = sorted(set(previous) - set(self.bundleIDs)) if complete else []
+
+    def __len__(self):
+        return len(self.bundleIDs)
+
+    def __repr__(self):
+        return '<DiskReport: {} apps, {} bytes>'.format(len(self), sum(self.total))
+
+    def rows(self):
+        '''Yields (bundle ID, static, dynamic, total, growth) tuples'''
+        return zip(self.bundleIDs, self.static, self.dynamic, self.total, self.growth)
+
+    def topGrowers(self, n=10):
+        '''The n apps that grew the most as (bundle ID, growth) tuples'''
+        order = sorted(range(len(self)), key=self.growth.__getitem__, reverse=True)[:n]
+        return [(self.bundleIDs[i], self.growth[i]) for i in order if self.growth[i] > 0]
+
+
+def disk_report(apps=None, path=None, save=True):
+    '''Gathers the static and dynamic disk usage of every app in one pass
+    apps: the apps to include, defaults to every installed app
+    path: where the last report is kept to work out growth, defaults to .disk_usage.json in Documents
+    save: store this report as the one the next report is compared to, a
+        report on some of the apps only updates those apps
+    Returns a DiskReport
+    '''
+    complete = apps is None
+    if complete:
+        apps = inventory.apps
+    if path is None:
+        path = os_path.join(os_path.expanduser('~/Documents'), '.disk_usage.json')
+    previous = {}
+    if os_path.exists(path):
+        try:
+            with open(path) as f:
+                previous = json.load(f)
+        except ValueError:
+            pass
+    rows = [(app.appID, _usage(app.objc.staticDiskUsage()), _usage(app.objc.dynamicDiskUsage())) for app in apps]
+    rows.sort(key=lambda row: row[1] + row[2], reverse=True)
+    report = DiskReport(rows, previous.get('apps'), previous.get('timestamp'), complete)
+    if save:
+        saved = {} if complete else dict(previous.get('apps') or {})
+        saved.update((bid, [static, dynamic]) for bid, static, dynamic in rows)
+        _writeAtomic(path, json.dumps({'timestamp': time(), 'apps': saved}).encode('utf-8'))
+    return report
+
+
+def _auditInfoPlist(app):
+    return objc_to_native(app.objc._infoDictionary().propertyList())
+
+
+_auditFields = {
+    'entitlements': lambda app: app.entitlements,
+    'infoPlist': _auditInfoPlist,
+    'backgroundModes': lambda app: app.backgroundModes,
+}
+
+
+class Audit (object):
+    '''Entitlements, Info.plist and background modes for many apps as Python structures
+    results maps each bundle ID to a dict of the audited fields. Inverted
+    indexes answer which apps have an entitlement, Info.plist key or
+    background mode without scanning every result.
+    '''
+    def __init__(self, results):
+        self.results = results
+        self._entitlements = {}
+        self._infoKeys = {}
+        self._backgroundModes = {}
+        for bid, fields in results.items():
+            for key in fields.get('entitlements') or {}:
+                self._entitlements.setdefault(key, []).append(bid)
+            for key in fields.get('infoPlist') or {}:
+                self._infoKeys.setdefault(key, []).append(bid)
+            for mode in fields.get('backgroundModes') or []:
+                self._backgroundModes.setdefault(mode, []).append(bid)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __repr__(self):
+        return '<Audit: {} apps>'.format(len(self))
+
+    @property
+    def entitlementKeys(self):
+        return sorted(self._entitlements)
+
+    def appsWithEntitlement(self, key, value=None):
+        '''Bundle IDs of apps with the entitlement key
+        value: only apps whose entitlement equals value, or contains it if it is a list
+        '''
+        bids = self._entitlements.get(key, [])
+        if value is None:
+            return list(bids)
+        returns = []
+        for bid in bids:
+            entitled = self.results[bid]['entitlements'][key]
+            if entitled == value or (isinstance(entitled, list) and value in entitled):
+                returns += [bid]
+        return returns
+
+    def appsWithInfoKey(self, key):
+        return list(self._infoKeys.get(key, []))
+
+    def appsWithBackgroundMode(self, mode):
+        return list(self._backgroundModes.get(mode, []))
+
+
+def audit(apps=None, fields=('entitlements', 'infoPlist', 'backgroundModes'), path=None, refresh=False):
+    '''Converts the chosen fields of many apps to Python structures
+    Results are cached per bundle ID and version at path so only new or
+    updated apps are converted again. Auditing every app also drops the
+    cached results of uninstalled apps.
+    fields: any of entitlements, infoPlist and backgroundModes
+    path: defaults to .app_audit.pickle in Documents
+    refresh: ignore the cache
+    Returns an Audit
+    '''
+    for field in fields:
+        if field not in _auditFields:
+            raise ValueError('{} can not be audited'.format(field))
+    complete = apps is None
+    apps = inventory.apps if complete else list(apps)
+    if path is None:
+        path = os_path.join(os_path.expanduser('~/Documents'), '.app_audit.pickle')
+    cache = {}
+    if not refresh and os_path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                cache = pickle.load(f)
+        except (pickle.UnpicklingError, EOFError):
+            pass
+    results = {}
+    for app in apps:
+        key = (app.appID, app.version)
+        cached = cache.setdefault(key, {})
+        for field in fields:
+            if field not in cached:
+                cached[field] = _auditFields[field](app)
+        results[app.appID] = {field: cached[field] for field in fields}
+    # Drop the entries for older versions of the apps, and for apps that are
+    # gone if every app was audited
+    current = {app.appID: app.version for app in apps}
+    cache = {(bid, version): value for (bid, version), value in cache.items()
+             if current.get(bid) == version or (not complete and bid not in current)}
+    _writeAtomic(path, pickle.dumps(cache))
+    return Audit(results)
 
 
 def _urlHandle(url):
@@ -223,16 +523,277 @@ def openWithBundleID(bid):
         return False
         
 
+class AppInventory (object):
+    '''Every installed app, enumerated once and indexed
+    The apps are only enumerated when first needed and again after refresh(),
+    or after an install or uninstall once watch() has been called.
+    workspace: an LSApplicationWorkspace, defaults to the default workspace
+    schemesPath: where the inventory's SchemeIndex is saved, defaults to the SchemeIndex default
+    >>> inventory = AppInventory()
+    >>> inventory.get('com.omz-software.Pythonista3')
+    >>> inventory.appsWithVendor('Apple')
+    '''
+    def __init__(self, workspace=None, schemesPath=None):
+        self._workspace = workspace
+        self.schemesPath = schemesPath
+        self._apps = None
+        self._schemeIndex = None
+        self.watching = False
+
+    def __repr__(self):
+        return '<AppInventory: {}>'.format('{} apps'.format(len(self._apps)) if self._apps is not None else 'not loaded')
+
+    @property
+    def workspace(self):
+        return self._workspace if self._workspace is not None else workspace
+
+    @property
+    def apps(self):
+        apps = self._apps
+        if apps is None:
+            # The observer can invalidate from another thread, so use what refresh() built
+            apps = self.refresh()
+        return apps
+
+    def __len__(self):
+        return len(self.apps)
+
+    def __iter__(self):
+        return iter(self.apps)
+
+    def __contains__(self, bid):
+        return self.get(bid) is not None
+
+    def refresh(self):
+        '''Enumerates the installed apps and rebuilds the indexes, returns the apps'''
+        apps = [App(app) for app in self.workspace.allInstalledApplications()]
+        self._byBundleID = {}
+        self._byVendor = {}
+        self._byTeamID = {}
+        self._byType = {}
+        for app in apps:
+            self._byBundleID[app.appID] = app
+            self._byVendor.setdefault(app.vendor, []).append(app)
+            self._byTeamID.setdefault(app.teamID, []).append(app)
+            self._byType.setdefault(app.type, []).append(app)
+        self._apps = apps
+        if self._schemeIndex is not None:
+            self._schemeIndex.reset()
+        return apps
+
+    def invalidate(self):
+        '''Drops the apps so they are enumerated again when next needed'''
+        self._apps = None
+        if self._schemeIndex is not None:
+            self._schemeIndex.reset()
+
+    @property
+    def schemeIndex(self):
+        '''The SchemeIndex for these apps, reset along with the inventory'''
+        if self._schemeIndex is None:
+            self._schemeIndex = SchemeIndex(self, self.schemesPath)
+        return self._schemeIndex
+
+    def get(self, bid):
+        self.apps
+        return self._byBundleID.get(bid)
+
+    @property
+    def vendors(self):
+        self.apps
+        return sorted(self._byVendor)
+
+    @property
+    def teamIDs(self):
+        self.apps
+        return sorted(self._byTeamID)
+
+    def appsWithVendor(self, vendor):
+        self.apps
+        return list(self._byVendor.get(vendor, []))
+
+    def appsWithTeamID(self, teamid):
+        self.apps
+        return list(self._byTeamID.get(teamid, []))
+
+    def appsOfType(self, apptype):
+        self.apps
+        if isinstance(apptype, str):
+            apptype = AppType[apptype]
+        return list(self._byType.get(AppType(apptype), []))
+
+    def appsWithScheme(self, scheme):
+        '''Apps that declare scheme in their Info.plist URL types'''
+        return self.schemeIndex.appsDeclaring(scheme)
+
+    def watch(self):
+        '''Invalidates the inventory whenever apps are installed or uninstalled'''
+        if not self.watching:
+            if not _watching:
+                self.workspace.addObserver_(_workspaceObserver())
+            _watching.append(self)
+            self.watching = True
+
+    def unwatch(self):
+        if self.watching:
+            _watching.remove(self)
+            if not _watching:
+                self.workspace.removeObserver_(_workspaceObserver())
+            self.watching = False
+
+
+_watching = []
+_observer = None
+
+
+def _applicationsChanged():
+    for inventory in list(_watching):
+        inventory.invalidate()
+
+
+def _workspaceObserver():
+    global _observer
+    if _observer is None:
+        def applicationsDidInstall_(_self, _cmd, apps):
+            _applicationsChanged()
+
+        def applicationsDidUninstall_(_self, _cmd, apps):
+            _applicationsChanged()
+        cls = create_objc_class('ObjcToolsAppInventoryObserver',
+                                methods=[applicationsDidInstall_, applicationsDidUninstall_],
+                                protocols=['LSApplicationWorkspaceObserverProtocol'])
+        _observer = cls.new()
+    return _observer
+
+
+inventory = AppInventory()
+
+
+# Bumped when the saved format changes so older files are rebuilt
+_schemeIndexVersion = 2
+
+
+class SchemeIndex (object):
+    '''URL scheme to app lookups built in a single pass
+    Every public scheme is resolved to the app that opens it once, and the
+    schemes each app declares come from its Info.plist. The result is saved to
+    path and reused until the set of installed apps or their versions change.
+    Use AppInventory.schemeIndex to get an index that is also reset whenever
+    the inventory is invalidated.
+    inventory: the AppInventory to index, defaults to the shared one
+    path: defaults to .url_schemes.json in Documents
+    '''
+    def __init__(self, inventory=None, path=None):
+        if path is None:
+            path = os_path.join(os_path.expanduser('~/Documents'), '.url_schemes.json')
+        self._inventory = inventory
+        self.path = path
+        self._openers = None
+
+    def __repr__(self):
+        if self._openers is None:
+            return '<SchemeIndex: not loaded>'
+        return '<SchemeIndex: {} public schemes, {} apps>'.format(len(self._openers), len(self._byApp))
+
+    @property
+    def inventory(self):
+        return self._inventory if self._inventory is not None else inventory
+
+    def _fingerprint(self):
+        apps = sorted('{}:{}'.format(app.appID, app.version) for app in self.inventory)
+        return sha1('\n'.join(apps).encode('utf-8')).hexdigest()
+
+    def load(self, refresh=False):
+        '''Loads the index from disk, or rebuilds it if the installed apps changed
+        refresh: always rebuild
+        '''
+        fingerprint = self._fingerprint()
+        data = None
+        if not refresh and os_path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+            except ValueError:
+                data = {}
+            if data.get('version') != _schemeIndexVersion or data.get('fingerprint') != fingerprint:
+                data = None
+        if data is None:
+            data = self._build(fingerprint)
+            _writeAtomic(self.path, json.dumps(data).encode('utf-8'))
+        self._openers = data['openers']
+        self._declared = data['declared']
+        byApp = {}
+        for scheme, bid in self._openers.items():
+            if bid:
+                byApp.setdefault(bid, set()).add(scheme)
+        for bid, schemes in self._declared.items():
+            byApp.setdefault(bid, set()).update(schemes)
+        self._byApp = {bid: sorted(schemes) for bid, schemes in byApp.items()}
+        self._byScheme = {}
+        self._declaredBy = {}
+        for bid, schemes in self._declared.items():
+            for scheme in schemes:
+                self._byScheme.setdefault(scheme, bid)
+                self._declaredBy.setdefault(scheme, []).append(bid)
+        # The app iOS actually opens a scheme with wins over other declarations
+        self._byScheme.update((scheme, bid) for scheme, bid in self._openers.items() if bid)
+
+    def _build(self, fingerprint):
+        ws = self.inventory.workspace
+        openers = {}
+        for scheme in ws.publicURLSchemes():
+            scheme = str(scheme)
+            app = ws.applicationForOpeningResource_(_urlHandle(scheme + '://'))
+            # Public schemes nothing opens are kept with no opener
+            openers[scheme.lower()] = str(app.applicationIdentifier()) if app else None
+        declared = {app.appID: [scheme.lower() for scheme in app.urlSchemes] for app in self.inventory}
+        return {'version': _schemeIndexVersion, 'fingerprint': fingerprint, 'openers': openers, 'declared': declared}
+
+    def reset(self):
+        '''Forgets the loaded index so it is checked against the apps again when next used'''
+        self._openers = None
+
+    def _ensure(self):
+        if self._openers is None:
+            self.load()
+
+    @property
+    def publicSchemes(self):
+        '''Every public scheme, including those no app opens'''
+        self._ensure()
+        return sorted(self._openers)
+
+    def appForScheme(self, scheme):
+        '''The App that opens scheme or None'''
+        self._ensure()
+        bid = self._byScheme.get(scheme.lower())
+        return self.inventory.get(bid) if bid else None
+
+    def schemesForApp(self, app):
+        '''The schemes an App or bundle ID opens or declares'''
+        self._ensure()
+        bid = app if isinstance(app, str) else app.appID
+        return list(self._byApp.get(bid, []))
+
+    def appsDeclaring(self, scheme):
+        '''The Apps that declare scheme in their Info.plist URL types'''
+        self._ensure()
+        apps = (self.inventory.get(bid) for bid in self._declaredBy.get(scheme.lower(), []))
+        return [app for app in apps if app is not None]
+
+
+schemeIndex = inventory.schemeIndex
+
+
 def allApps():
-    return [App(app) for app in workspace.allInstalledApplications()]
+    '''Every installed app, from the shared inventory'''
+    if not inventory.watching:
+        inventory.watch()
+    return list(inventory.apps)
 
 
 def enumUrlSchemes():
-    returns = []
-    for i in [str(i) for i in workspace.publicURLSchemes()]:
-        app = workspace.applicationForOpeningResource_(_urlHandle(i+'://'))
-        returns += [{'scheme': i,'app': App(app)}]
-    return returns
+    return [{'scheme': i, 'app': schemeIndex.appForScheme(i)} for i in schemeIndex.publicSchemes]
 
 
 def backgroundApps():
@@ -249,12 +810,14 @@ def overideChecker(url):
     return workspace.URLOverrideForURL_(_urlHandle(url))
 
 
-def getVendors(applist=allApps()):
+def getVendors(applist=None):
+    if applist is None:
+        return inventory.vendors
     return sorted(set(app.vendor for app in applist))
 
 
 def getPythonista():
-    return [app for app in allApps() if 'Pythonista' in app.appID]
+    return [app for app in inventory if 'Pythonista' in app.appID]
 
 
 def getAppByBID(bid):
@@ -264,8 +827,10 @@ def getAppByBID(bid):
     else:
         return App(a)
 
-def getVendorApps(applist = allApps(), vendor = None):
+def getVendorApps(applist = None, vendor = None):
     '''Apps that have vendor names strings will be returned'''
+    if applist is None:
+        applist = inventory.apps
     results = {}
     if vendor:
         results[vendor] = []
@@ -273,7 +838,7 @@ def getVendorApps(applist = allApps(), vendor = None):
             if app.vendor == vendor:
                 results[vendor] += [app]
     else:
-        allVendors = getVendors()
+        allVendors = getVendors(applist)
         for i in allVendors:
             results[i] = []
         for app in applist:
@@ -284,10 +849,14 @@ def getVendorApps(applist = allApps(), vendor = None):
                 
     return results
     
-def getTeamIDs(applist = allApps()):
+def getTeamIDs(applist = None):
+    if applist is None:
+        return inventory.teamIDs
     return sorted(set(app.teamID for app in applist))
     
-def getAppsWithTeamID(teamid, applist = allApps()):
+def getAppsWithTeamID(teamid, applist = None):
+    if applist is None:
+        return inventory.appsWithTeamID(teamid)
     results = []
     for app in applist:
         if app.teamID == teamid:
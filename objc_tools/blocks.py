@@ -1,41 +1,69 @@
 __doc__ = '''This lib is for making ObjCBlocks useful.
-             DO NOT USE from objc_tools.blocks import * This module relys on it's name'''
+             Every call of a Block resolves a Future, so the results can be waited on without polling'''
 from objc_util import ObjCBlock, c_void_p
-from uuid import uuid4
-from sys import modules
-#global _objects
-_objects = {}
+from concurrent.futures import Future, TimeoutError
+from collections import deque
+from threading import Lock
 
 
 class Block (object):
+    '''Wraps an ObjCBlock and hands out what it was called with
+    Calls are matched to waiters in order, so one Block can be passed to many
+    ObjC calls at once.
+    >>> b = Block()
+    >>> center.getNotificationSettingsWithCompletionHandler_(b.block)
+    >>> settings, = b.wait(timeout=5)
+    '''
     def __init__(self, argtypes=[c_void_p, c_void_p], restype=None):
+        self._lock = Lock()
+        # Futures handed out that haven't been resolved yet
+        self._waiting = deque()
+        # Futures resolved before anyone asked for them
+        self._results = deque()
         self.block = ObjCBlock(self.handler, argtypes=argtypes, restype=restype)
         
-    def handler(_cmd, *args):
-        global id
-        id = uuid4()
-        this = modules[__name__]
-        handled = []
-        for i in args:
-            handled += [i]
-        this._objects[id] = handled
-        return id
+    def handler(self, _cmd, *args):
+        with self._lock:
+            if self._waiting:
+                future = self._waiting.popleft()
+            else:
+                future = Future()
+                self._results.append(future)
+        future.set_result(list(args))
+
+    def future(self):
+        '''A Future resolved with the arguments of the next unclaimed call'''
+        with self._lock:
+            if self._results:
+                return self._results.popleft()
+            future = Future()
+            self._waiting.append(future)
+            return future
+
+    def wait(self, timeout=None):
+        '''Waits for the next unclaimed call and returns the arguments it was called with
+        Raises TimeoutError if there isn't one within timeout seconds
+        '''
+        future = self.future()
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            with self._lock:
+                if future in self._waiting:
+                    # Not resolved, give the slot up so the next call isn't lost
+                    self._waiting.remove(future)
+                    raise
+            return future.result()
             
-    def check_for_objects(self, block_exec=True, ident = None):
-        '''Checks for objects in the _objects global and returns them
-           param: block_exec: Block until their are objects, if False will just pass with None if nothing is found
+    def check_for_objects(self, block_exec=True, ident=None, timeout=None):
+        '''Returns the arguments of the next call
+           param: block_exec: Block until there are objects, if False will just pass with None if nothing is found
+           param: timeout: seconds to block for before raising TimeoutError
+           ident is no longer used, every Block keeps its own results
         '''
-        this = modules[__name__]
-        if not ident:
-            if this.id:
-                ident = this.id
-            else:
-                raise NameError('No IDs')
-                return None
         if block_exec:
-            while not any(this._objects[ident]):
-                pass
-        returns = this._objects[ident]
-        del this._objects[ident]
-        return returns
-            
+            return self.wait(timeout)
+        with self._lock:
+            if self._results:
+                return self._results.popleft().result()
+        return None
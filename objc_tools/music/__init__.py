@@ -0,0 +1,1608 @@
+from objc_util import ObjCClass, NSBundle, uiimage_to_png, nsurl, ObjCInstance, ns, ObjCBlock, c_void_p
+from io import BytesIO
+from PIL import Image
+from urllib.parse import urlparse
+from os import path as os_path, makedirs, replace
+from time import time, monotonic
+import sqlite3
+from sys import intern
+import re
+import unicodedata
+from collections import namedtuple, OrderedDict, deque
+from threading import Lock, Timer, Event, get_ident
+import asyncio
+from abc import ABC, abstractmethod
+from traceback import print_exc
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha1
+import numpy as np
+from objc_tools.device import osVersion
+from objc_tools.backports.enum_backport import IntEnum, Flag
+from objc_tools.foundation.error import ObjcErrorHandler, NSError
+media_player_bundle = NSBundle.bundleWithPath_('/System/Library/Frameworks'
+                                               '/MediaPlayer.framework')
+media_player_bundle.load()
+iOS_version = osVersion()[0]+(osVersion()[1]/10)
+del media_player_bundle, osVersion
+MPMediaLibrary = ObjCClass("MPMediaLibrary")
+MPMediaQuery = ObjCClass('MPMediaQuery')
+MPMusicPlayerController = ObjCClass('MPMusicPlayerController')
+NSNotificationCenter = ObjCClass('NSNotificationCenter')
+file_handler = ObjCClass('AVAudioFile').alloc()
+
+MPMediaPropertyPredicate = ObjCClass("MPMediaPropertyPredicate")
+MPMediaItem = ObjCClass('MPMediaItem')
+NSNumber = ObjCClass('NSNumber')
+
+
+class RepeatMode (IntEnum):
+    Default = 0
+    # We use lowercase none to seperate it from the keyword None
+    none = 1
+    One = 2
+    All = 3
+        
+
+class ShuffleMode (IntEnum):
+    Default = 0
+    Off = 1
+    Songs = 2
+    Albums = 3
+    
+
+class PlaybackState (IntEnum):
+    Stopped = 0
+    Playing = 1
+    Paused = 2
+    Interrupted = 3
+    SeekingForward = 4
+    SeekingBackward = 5
+
+
+class FileDesc (object):
+    """Used to get information on a media file"""
+    def __init__(self, url):
+        if type(url) == str:
+            url = nsurl(url)
+        if type(url) == ObjCInstance:
+            self.errorhandler = eHandler()
+            self._objc = file_handler.initForReading_error_(url, None)
+            fformat = self.sf.fileFormat()
+            self.sampleRate = fformat.sampleRate()
+            self.channels = fformat.channelCount()
+            self.format = urlparse(str(url)).path.split('.')[-1]
+
+
+def _lyrics(song):
+    lyrics = str(song.lyrics())
+    return lyrics if len(lyrics) else None
+
+
+# (attribute, getter) pairs for every Song field, in the order they used to be
+# loaded. The getters take the raw MPMediaItem.
+_song_fields = (
+    ('title', lambda song: str(song.title())),
+    ('genre', lambda song: str(song.genre()).replace('\n', '')),
+    ('composer', lambda song: str(song.composer())),
+    ('artist', lambda song: str(song.artist())),
+    ('albumArtist', lambda song: str(song.albumArtist())),
+    ('duration', lambda song: float(song.playbackDuration())),
+    ('skips', lambda song: int(song.skipCount())),
+    ('rating', lambda song: int(song.rating())),
+    ('comments', lambda song: str(song.comments())),
+    ('inLibrary', lambda song: song.existsInLibrary()),
+    ('compolation', lambda song: song.isCompilation()),
+    ('cloud', lambda song: song.isCloudItem()),
+    ('lyrics', _lyrics),
+    ('playCount', lambda song: song.playCount()),
+    ('year', lambda song: int(song.year())),
+    ('album', lambda song: str(song.albumTitle())),
+    ('trackNumber', lambda song: song.albumTrackNumber()),
+    ('discNumber', lambda song: song.discNumber()),
+    ('bpm', lambda song: song.beatsPerMinute() or None),
+    ('assetURL', lambda song: song.assetURL()),
+    ('persistentID', lambda song: int(song.persistentID())),
+    ('albumPersistentID', lambda song: int(song.albumPersistentID())),
+)
+
+
+class _LazyField (object):
+    """Fetches a field from the ObjC item on first access and memoizes it in a slot"""
+    def __init__(self, getter, slot):
+        self.getter = getter
+        self.slot = slot
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return self.slot.__get__(instance, owner)
+        except AttributeError:
+            value = self.getter(instance._objc)
+            self.slot.__set__(instance, value)
+            return value
+
+    def __set__(self, instance, value):
+        self.slot.__set__(instance, value)
+
+    def __delete__(self, instance):
+        # Forget the memoized value so the next access fetches it again
+        try:
+            self.slot.__delete__(instance)
+        except AttributeError:
+            pass
+
+
+class Song (object):
+    """Parses song items
+    :song: an objc instance of a song item
+
+    Fields are only fetched from the bridge when they are first read, use
+    prefetch() to load several of them up front.
+    """
+    fields = tuple(name for name, getter in _song_fields)
+    __slots__ = ('_item', 'file') + tuple('_' + name for name in fields)
+
+    def __init__(self, song):
+        try:
+            title = song.title()
+        except AttributeError:
+            raise TypeError('Not a song item')
+        self._item = song
+        self._title = str(title)
+
+    @classmethod
+    def from_values(cls, values, item=None):
+        """Builds a song from already extracted fields
+        Fields that are missing are fetched from the item when read, if no item
+        is given it is looked up by the persistentID in values. Reading them
+        raises LookupError if the song is no longer in the library.
+        """
+        if item is None and 'persistentID' not in values:
+            raise ValueError('Needs an item or a persistentID')
+        song = cls.__new__(cls)
+        song._item = item
+        for name, value in values.items():
+            setattr(song, name, value)
+        return song
+
+    @property
+    def _objc(self):
+        if self._item is None:
+            self._item = item_for_persistent_id(self.persistentID)
+            if self._item is None:
+                raise LookupError('No song with persistentID {} in the library'.format(self.persistentID))
+        return self._item
+
+    def __str__(self):
+        return '{0} - {1} - ({2})'.format(self.title, self.artist, self.album)
+        
+    def __repr__(self):
+        return '<Song: {0} - {1} - ({2})>'.format(self.title, self.artist, self.album)
+
+    def prefetch(self, fields=None):
+        """Loads the given fields (all of them by default) in one go
+        Returns the song so calls can be chained
+        """
+        for name in fields or self.fields:
+            if name not in self.fields:
+                raise ValueError('{} is not a song field'.format(name))
+            getattr(self, name)
+        return self
+        
+    def artwork(self, brep=False, size=None):
+        """Get artwork for the song item
+        brep determines if we want a PIL image or just the binary version
+        size: a (width, height) to get a thumbnail that fits in it instead
+        Artwork is shared by album so it goes through artwork_cache
+        """
+        return artwork_cache.artwork(self._artwork_key(), lambda: self._objc.artworkCatalog(), brep, size)
+
+    def _artwork_key(self):
+        if self.albumPersistentID:
+            return ('album', self.albumPersistentID)
+        return ('song', self.persistentID)
+    
+    def file_info(self):
+        """Sets the file atribute of the item (used to save memory)"""
+        self.file = FileDesc(self.assetURL)
+
+
+for _name, _getter in _song_fields:
+    setattr(Song, _name, _LazyField(_getter, Song.__dict__['_' + _name]))
+del _name, _getter
+    
+
+def _thumbnail(png, size):
+    image = Image.open(BytesIO(png))
+    image.thumbnail(size)
+    with BytesIO() as buffer:
+        image.save(buffer, 'PNG')
+        return buffer.getvalue()
+
+
+def _write_atomic(path, data):
+    """Writes the bytes to path through a temp file, so an interrupted write never leaves a partial file"""
+    temp = '{}.{}.tmp'.format(path, get_ident())
+    with open(temp, 'wb') as f:
+        f.write(data)
+    replace(temp, path)
+
+
+# Cached in place of the PNG for keys without artwork
+_no_artwork = b''
+
+
+class ArtworkCache (object):
+    """An LRU cache of artwork PNGs
+    Entries are keyed by a stable id (e.g. ('album', albumPersistentID)) and
+    an optional thumbnail size, and the least recently used ones are dropped
+    once their total size passes max_bytes. Keys without artwork are
+    remembered too so their catalog isn't asked again.
+
+    max_bytes: the memory budget for cached PNG data
+    directory: if set thumbnails are also kept on disk there
+    encoder: turns the UIImage from the catalog into PNG bytes, defaults to uiimage_to_png
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024, directory=None, encoder=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.encoder = encoder or uiimage_to_png
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.diskHits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '<ArtworkCache: {} images, {}/{} bytes>'.format(len(self), self.size, self.max_bytes)
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'diskHits': self.diskHits,
+                'evictions': self.evictions, 'bytes': self.size, 'images': len(self)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _get(self, key, count=True):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+            return data
+
+    def _put(self, key, data):
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes and self._entries:
+                self.size -= len(self._entries.popitem(last=False)[1])
+                self.evictions += 1
+
+    def _path(self, key, size):
+        name = '{}_{}x{}.png'.format('_'.join(str(i) for i in key), size[0], size[1])
+        return os_path.join(self.directory, name)
+
+    def png(self, key, catalog, size=None):
+        """Returns the PNG bytes for key or None if there is no artwork
+        catalog: a callable returning the artwork catalog, only called on a miss
+        size: a (width, height) or int to get a thumbnail that fits in it
+        """
+        if isinstance(size, int):
+            size = (size, size)
+        data = self._get((key, size))
+        if data is not None:
+            return data or None
+        if size and self.directory:
+            path = self._path(key, size)
+            if os_path.exists(path):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.diskHits += 1
+                self._put((key, size), data)
+                return data
+        self.misses += 1
+        # The full size image may already be cached for another thumbnail size
+        data = self._get((key, None), count=False)
+        if data is None:
+            artwork = catalog()
+            uiimage = artwork.bestImageFromDisk() if artwork else None
+            data = self.encoder(uiimage) if uiimage else _no_artwork
+            self._put((key, None), data)
+        if not data:
+            return None
+        if size:
+            data = _thumbnail(data, size)
+            if self.directory:
+                makedirs(self.directory, exist_ok=True)
+                _write_atomic(self._path(key, size), data)
+            self._put((key, size), data)
+        return data
+
+    def artwork(self, key, catalog, brep=False, size=None):
+        """Like png() but returns a PIL image unless brep is set"""
+        data = self.png(key, catalog, size)
+        if data is None or brep:
+            return data
+        return Image.open(BytesIO(data))
+
+
+artwork_cache = ArtworkCache()
+
+
+def export_artwork(songs, dest_dir, size=None, workers=4, cache=None):
+    """Writes the artwork for songs to dest_dir, encoding each album's image once
+    Files are named after the sha1 of their contents so identical images are
+    only written once. Reading the catalogs stays on the calling thread, the
+    PIL resize and encode work runs on a pool of workers.
+
+    size: a (width, height) or int to export thumbnails that fit in it
+    cache: the ArtworkCache to read from, defaults to artwork_cache
+    Returns a dict of song: file path, songs without artwork are left out
+    """
+    cache = cache or artwork_cache
+    if isinstance(size, int):
+        size = (size, size)
+    groups = OrderedDict()
+    for song in songs:
+        groups.setdefault(song._artwork_key(), []).append(song)
+    makedirs(dest_dir, exist_ok=True)
+
+    def write(png):
+        if size:
+            png = _thumbnail(png, size)
+        path = os_path.join(dest_dir, sha1(png).hexdigest() + '.png')
+        if not os_path.exists(path):
+            _write_atomic(path, png)
+        return path
+
+    paths = {}
+
+    def collect(group, future):
+        path = future.result()
+        for song in group:
+            paths[song] = path
+
+    with ThreadPoolExecutor(workers) as pool:
+        pending = deque()
+        for key, group in groups.items():
+            png = cache.png(key, lambda: group[0]._objc.artworkCatalog())
+            if png is not None:
+                pending.append((group, pool.submit(write, png)))
+            # Only keep a few full size images waiting for the workers
+            while len(pending) > workers * 2:
+                collect(*pending.popleft())
+        while pending:
+            collect(*pending.popleft())
+    return paths
+
+
+AddChunkResult = namedtuple('AddChunkResult', ['index', 'count', 'completed', 'error', 'seconds'])
+
+
+class AddSongsReport (object):
+    """The outcome of Playlist.add_songs"""
+    def __init__(self):
+        self.chunks = []
+
+    def __repr__(self):
+        return '<AddSongsReport: {} songs added in {:.2f}s ({:.1f} songs/s)>'.format(self.added, self.seconds, self.throughput)
+
+    @property
+    def added(self):
+        return sum(chunk.count for chunk in self.chunks if chunk.completed and chunk.error is None)
+
+    @property
+    def seconds(self):
+        return sum(chunk.seconds for chunk in self.chunks)
+
+    @property
+    def throughput(self):
+        return self.added / self.seconds if self.seconds else 0.0
+
+
+class Playlist (object):
+    """Playlist object"""
+    def __init__(self, playlist):
+        try:
+            playlist.name()
+        except AttributeError:
+            raise TypeError('Not a playlist item')
+        self.title = str(playlist.name())
+        self.cloudMix = playlist.isCloudMix()
+        self.inLibrary = playlist.existsInLibrary()
+        if iOS_version >= 9.3:
+            self.description = str(playlist.descriptionText())
+            self.authorName = str(playlist.authorDisplayName())
+        else:
+            self.description = None
+            self.authorName = None
+        self.itemCount = playlist.count()
+        self._objc = playlist
+        # completion blocks from add_songs that haven't fired yet
+        self._blocks = []
+    
+    class Attributes (Flag):
+        AttributeNone = 0
+        AttributeOnTheGo = (1 << 0)  # if set, the playlist was created on a device rather than synced from iTunes
+        AttributeSmart = (1 << 1)
+        AttributeGenius = (1 << 2)
+    
+    def __str__(self):
+        return self.title
+    
+    def __repr__(self):
+        return "<Playlist: {0}>".format(self.title)
+    
+    @property
+    def attributes(self):
+        return self.Attributes(self._objc.playlistAttributes())
+    
+    @property
+    def songs(self):
+        """Populate the items item"""
+        return list(self.iter_songs())
+
+    def iter_songs(self, chunk_size=None):
+        """Yields the playlist's songs one at a time, or in lists of chunk_size"""
+        return _chunked((Song(i) for i in self._objc.items()), chunk_size)
+    
+    def artwork(self, brep=False, size=None):
+        """Get artwork for the song item
+        brep determines if we want a PIL image or just the binary version
+        size: a (width, height) to get a thumbnail that fits in it instead
+        """
+        key = ('playlist', int(self._objc.persistentID()))
+        return artwork_cache.artwork(key, lambda: self._objc.artworkCatalog(), brep, size)
+            
+    def setName(self, text):
+        """Sets the name of the playlist
+        Returns True or False if the name was changed or not
+        """
+        if type(text) != str:
+            raise TypeError('Must be string')
+        else:
+            state = self._objc.setValue_forProperty_(text, 'name')
+            if state:
+                self.title = text
+                return True
+            else:
+                return False
+            
+    # Too unstable to use
+    """def artworkTile(self, brep=False, rows = 2, columns = 2):
+        Get artwork for the song item
+        brep determines if we want a PIL image or just the binary version
+        
+        finished = False
+        if self.playlist.tiledArtworkCatalogWithRows_columns_(rows, columns).hasImageOnDisk():
+            finished = True
+        else:
+            self.playlist.tiledArtworkCatalogWithRows_columns_(rows, columns).requestImageWithCompletionHandler(None)
+            sleep(0.5)
+        uiimage = self.playlist.tiledArtworkCatalogWithRows_columns_(rows, columns).bestImageFromDisk()
+        if brep:
+            return uiimage_to_png(uiimage)
+        else:
+            i = BytesIO(uiimage_to_png(uiimage))
+            return Image.open(i)
+"""
+
+    def addSong(self, song):
+        if isinstance(song, (Song)):
+            if iOS_version >= 9.3:
+                self._objc.addItem_completionBlock_(song._objc, None)
+            else:
+                raise OSError("Adding songs requires iOS 9.3 or greater")
+        else:
+            raise TypeError('Must be a song')
+
+    def add_songs(self, songs, chunk_size=500, timeout=30):
+        """Adds many songs with addItems:completionHandler: a chunk at a time
+        Each chunk is waited on for up to timeout seconds before the next is
+        sent, if one times out the rest are not sent.
+        Returns an AddSongsReport with the result of every chunk
+        """
+        if iOS_version < 9.3:
+            raise OSError("Adding songs requires iOS 9.3 or greater")
+        songs = list(songs)
+        if not all(isinstance(song, Song) for song in songs):
+            raise TypeError('Must be songs')
+        report = AddSongsReport()
+        for index, chunk in enumerate(_chunked(songs, chunk_size)):
+            done = Event()
+            errors = []
+
+            def handler(_cmd, error, done=done, errors=errors):
+                errors.append(error)
+                done.set()
+            block = ObjCBlock(handler, restype=None, argtypes=[c_void_p, c_void_p])
+            # Kept around in case the handler fires after we stop waiting
+            self._blocks += [block]
+            start = time()
+            self._objc.addItems_completionHandler_(songlist_to_array(chunk), block)
+            completed = done.wait(timeout)
+            error = NSError(ObjCInstance(errors[0])) if completed and errors[0] else None
+            report.chunks += [AddChunkResult(index, len(chunk), completed, error, time() - start)]
+            if completed:
+                self._blocks.remove(block)
+            else:
+                break
+        if report.added:
+            self.itemCount = self._objc.count()
+        return report
+
+
+# MPMediaItem property keys and the Song fields holding the same value
+_item_properties = {
+    'title': 'title',
+    'albumTitle': 'album',
+    'artist': 'artist',
+    'albumArtist': 'albumArtist',
+    'genre': 'genre',
+    'composer': 'composer',
+    'comments': 'comments',
+    'lyrics': 'lyrics',
+    'playbackDuration': 'duration',
+    'skipCount': 'skips',
+    'rating': 'rating',
+    'playCount': 'playCount',
+    'year': 'year',
+    'albumTrackNumber': 'trackNumber',
+    'discNumber': 'discNumber',
+    'beatsPerMinute': 'bpm',
+    'isCompilation': 'compolation',
+    'isCloudItem': 'cloud',
+    'persistentID': 'persistentID',
+    'assetURL': 'assetURL',
+}
+_song_properties = {field: key for key, field in _item_properties.items()}
+
+
+class Term (ABC):
+    """A filter expression, terms can be combined with & (and), | (or) and ~ (not)
+    prop: an MPMediaItem property key or a Song field name
+    """
+    def __init__(self, prop):
+        if prop in _item_properties:
+            self.property, self.field = prop, _item_properties[prop]
+        elif prop in Song.fields:
+            self.property, self.field = _song_properties.get(prop), prop
+        else:
+            # Only readable through valueForProperty:
+            self.property, self.field = prop, None
+
+    def __and__(self, other):
+        return AllOf(self, other)
+
+    def __or__(self, other):
+        return AnyOf(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+    def value(self, song):
+        if self.field:
+            return getattr(song, self.field)
+        value = song._objc.valueForProperty_(self.property)
+        if isinstance(value, ObjCInstance):
+            return value.doubleValue() if value.isKindOfClass_(NSNumber) else str(value)
+        return value
+
+    @abstractmethod
+    def matches(self, song):
+        """Whether song matches the term"""
+
+
+class Equals (Term):
+    """Matches songs where the property equals query"""
+    comparison = 0
+
+    def __init__(self, prop, query):
+        Term.__init__(self, prop)
+        self.query = query
+
+    def __repr__(self):
+        return '[Query: {0}, Property: {1}, Contains: {2}]'.format(self.query, self.property, bool(self.comparison))
+
+    def matches(self, song):
+        return self.value(song) == self.query
+
+    def predicate(self):
+        return MPMediaPropertyPredicate.predicateWithValue_forProperty_comparisonType_(self.query, self.property, self.comparison)
+
+
+class Contains (Equals):
+    """Matches songs where the property contains query, ignoring case"""
+    comparison = 1
+
+    def matches(self, song):
+        return str(self.query).lower() in str(self.value(song)).lower()
+
+
+class Between (Term):
+    """Matches songs where low <= property <= high, either bound may be None"""
+    def __init__(self, prop, low=None, high=None):
+        Term.__init__(self, prop)
+        self.low = low
+        self.high = high
+
+    def __repr__(self):
+        return '[{0} <= {1} <= {2}]'.format(self.low, self.property or self.field, self.high)
+
+    def matches(self, song):
+        value = self.value(song)
+        if value is None:
+            return False
+        return (self.low is None or value >= self.low) and (self.high is None or value <= self.high)
+
+
+class Matches (Term):
+    """Matches songs where the regular expression is found in the property"""
+    def __init__(self, prop, pattern, flags=0):
+        Term.__init__(self, prop)
+        self.pattern = re.compile(pattern, flags)
+
+    def __repr__(self):
+        return '[{0} ~ /{1}/]'.format(self.property or self.field, self.pattern.pattern)
+
+    def matches(self, song):
+        return self.pattern.search(str(self.value(song))) is not None
+
+
+class AllOf (Term):
+    def __init__(self, *terms):
+        self.terms = []
+        for term in terms:
+            self.terms += term.terms if isinstance(term, AllOf) else [term]
+
+    def __repr__(self):
+        return '(' + ' and '.join(repr(term) for term in self.terms) + ')'
+
+    def matches(self, song):
+        return all(term.matches(song) for term in self.terms)
+
+
+class AnyOf (Term):
+    def __init__(self, *terms):
+        self.terms = []
+        for term in terms:
+            self.terms += term.terms if isinstance(term, AnyOf) else [term]
+
+    def __repr__(self):
+        return '(' + ' or '.join(repr(term) for term in self.terms) + ')'
+
+    def matches(self, song):
+        return any(term.matches(song) for term in self.terms)
+
+
+class Not (Term):
+    def __init__(self, term):
+        self.term = term
+
+    def __repr__(self):
+        return 'not ' + repr(self.term)
+
+    def matches(self, song):
+        return not self.term.matches(song)
+
+
+class Filter (object):
+    """Used for filtering the media library
+    
+    query: The text to search
+    ftype: a filter type. Must be one of the filter properties from https://developer.apple.com/reference/mediaplayer/mpmediaitem?language=objc
+    contains: Bollean if set will check if it contains the query else it will look for exact matches.
+
+    Richer expressions can be added with where(), anything that can't be
+    expressed as an MPMediaPropertyPredicate is checked locally on each song.
+    >>> f = Filter('Beatles', 'artist').where(Between('playCount', 10) | Matches('title', '(?i)live'))
+    >>> print(f.explain())
+    """
+    def __init__(self, query, ftype, contains=True):
+        self.terms = []
+        self.add(query, ftype, contains)
+
+    @classmethod
+    def expression(cls, term):
+        """Creates a filter from a single term"""
+        f = cls.__new__(cls)
+        f.terms = [term]
+        return f
+        
+    def __repr__(self):
+        return '<filter ' + ', '.join(repr(term) for term in self.terms) + '>'
+
+    @property
+    def query(self):
+        return [{'query': term.query, 'property': term.property, 'contains': bool(term.comparison)}
+                for term in self.terms if isinstance(term, Equals)]
+        
+    def add(self, query, ftype, contains):
+        if not canFilter(ftype):
+            raise TypeError('ftype not filterable')
+        else:
+            self.terms += [Contains(ftype, query) if contains else Equals(ftype, query)]
+
+    def where(self, term):
+        """Adds a term that must also match, returns the filter"""
+        self.terms += [term]
+        return self
+
+    def plan(self):
+        """Splits the terms into the native predicates and the local remainder
+        Returns a tuple of (native terms, local term or None)
+        """
+        native = []
+        local = []
+        for term in AllOf(*self.terms).terms:
+            if isinstance(term, Equals) and term.property and canFilter(term.property):
+                native += [term]
+            else:
+                local += [term]
+        return native, AllOf(*local) if local else None
+
+    def explain(self):
+        """Describes how the filter will be run"""
+        native, local = self.plan()
+        lines = ['MPMediaQuery.songsQuery()']
+        lines += ['  native: ' + repr(term) for term in native]
+        if local:
+            lines += ['  local:  ' + repr(term) for term in local.terms]
+        return '\n'.join(lines)
+
+    def iter_matches(self, query=None):
+        """Yields the matching songs as they are found
+        query: a callable returning the query to run, defaults to MPMediaQuery.songsQuery
+        """
+        native, local = self.plan()
+        query = query() if query else MPMediaQuery.songsQuery()
+        for term in native:
+            query.addFilterPredicate_(term.predicate())
+        for item in query.items():
+            # Songs load fields lazily so only what the local terms read is fetched
+            song = Song.from_values({}, item)
+            if local is None or local.matches(song):
+                yield song
+            
+    def getMatches(self):
+        return list(self.iter_matches())
+        
+
+# A lightweight entry in the play queue, the song's fields load lazily
+QueueItem = namedtuple('QueueItem', ['index', 'song'])
+
+# changes is a frozenset of the _player_notifications values that fired
+PlayerEvent = namedtuple('PlayerEvent', ['changes', 'state', 'song', 'playbackTime', 'timestamp'])
+
+_player_notifications = {
+    'MPMusicPlayerControllerNowPlayingItemDidChangeNotification': 'nowPlaying',
+    'MPMusicPlayerControllerPlaybackStateDidChangeNotification': 'state',
+}
+
+
+class _Subscription (object):
+    def __init__(self, callback, queue, loop):
+        self.callback = callback
+        self.queue = queue
+        self.loop = loop
+
+    def deliver(self, event):
+        if self.callback:
+            # A failing callback mustn't stop the event reaching the others
+            try:
+                self.callback(event)
+            except Exception:
+                print_exc()
+        if self.queue is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+
+class NowPlayingController (object):
+    """Controls the music player
+    debounce: seconds to wait for more notifications before sending an event to subscribers
+    notification_center: defaults to NSNotificationCenter.defaultCenter()
+    """
+    def __init__(self, _objc=MPMusicPlayerController.systemMusicPlayer(), debounce=0.1, notification_center=None):
+        self._objc = _objc
+        self.error = None
+        self.debounce = debounce
+        self._queue = None
+        self._queue_key = None
+        self._center = notification_center
+        self._observers = []
+        self._subscriptions = []
+        self._pending = set()
+        self._timer = None
+        self._lock = Lock()
+        # (playbackTime, monotonic time, rate, state) at the last event
+        self._anchor = None
+        
+    @property
+    def repeat(self):
+        return RepeatMode(self._objc.repeatMode())
+    
+    @repeat.setter
+    def repeat(self, mode):
+        """Set the music player repeat mode
+           Must be an int or RepeatMode Object
+        """
+        self._objc.setRepeatMode_(int(mode))
+        
+    @property
+    def shuffle(self):
+        return ShuffleMode(self._objc.shuffleMode())
+        
+    @shuffle.setter
+    def shuffle(self, mode):
+        """Set the player's shuffle mode
+           Must be a ShuffleMode item or an int
+        """
+        self._objc.setShuffleMode_(int(mode))
+    
+    @property
+    def state(self):
+        return PlaybackState(self._objc.playbackState())
+        
+    @property
+    def now_playing(self):
+        if self._objc.nowPlayingItem():
+            return Song(self._objc.nowPlayingItem())
+        else:
+            return None
+    
+    @now_playing.setter
+    def now_playing(self, item):
+        if isinstance(item, Song):
+            self._objc.setNowPlayingItem_(item._objc)
+
+    def play(self):
+        """Starts playback of the music app"""
+        self._objc.play()
+    
+    def pause(self):
+        """Pauses playback of the music app"""
+        self._objc.pause()
+        
+    def play_pause(self):
+        """Toggles playback state of the music app"""
+        if self.state == PlaybackState.Playing:
+            self._objc.pause()
+        else:
+            self._objc.play()
+    
+    def stop(self):
+        """Stops playback of the music app"""
+        self._objc.stop()
+    
+    def skip_next(self):
+        """Skips to the next song in the music app"""
+        error = ObjcErrorHandler()
+        self._objc.skipInDirection_error_(1, error)
+        e = error.error()
+        self.error = e
+    
+    def replay(self):
+        """Returns to the begining of the current song"""
+        self._objc.setCurrentPlaybackTime_(0)
+    
+    def skip_previous(self):
+        error = ObjcErrorHandler()
+        """Returns to the song before the current song in the music app"""
+        self._objc.skipInDirection_error_(-1, error)
+        e = error.error()
+        self.error = e
+    
+    @property
+    def next_song_info(self):
+        """Returns the song instance of the next song to be played, None if nothing is queued"""
+        cur_index = self._objc.indexOfNowPlayingItem()
+        return self.song_at_index(cur_index+1)
+    
+    @property
+    def volume(self):
+        """Get's the current volume"""
+        return self._objc.volume()
+        
+    @volume.setter
+    def volume(self, v):
+        """Officially unsupported method of changing the volume
+        Must be a float from 0 to 1
+        """
+        if type(v) != float:
+            if type(v) == int:
+                v = float(v)
+            else:
+                raise TypeError('Has to be a number')
+    
+        if not 0 <= v <= 1:
+            raise ValueError('Has to be between 0 or 1')
+        
+        self._objc.setVolume_(v)
+        
+    @property
+    def playbackRate(self):
+        return self._objc.currentPlaybackRate()
+    
+    @playbackRate.setter
+    def playbackRate(self, rate):
+        if self._anchor:
+            # Interpolate from here on at the new rate
+            self._anchor = (self.interpolated_time, monotonic(), rate, self._anchor[3])
+        self._objc.setCurrentPlaybackRate_(rate)
+        
+    @property
+    def playbackTime(self):
+        return self._objc.currentPlaybackTime()
+        
+    @playbackTime.setter
+    def playbackTime(self, time):
+        self._objc.setCurrentPlaybackTime_(time)
+        if self._anchor:
+            self._anchor = (time, monotonic()) + self._anchor[2:]
+
+    @property
+    def interpolated_time(self):
+        """The playback time estimated from the last event without a bridge call
+        Only kept up to date while there are subscribers
+        """
+        if self._anchor is None:
+            return self.playbackTime
+        playback_time, at, rate, state = self._anchor
+        if state == PlaybackState.Playing:
+            return playback_time + (monotonic() - at) * rate
+        return playback_time
+        
+    @property
+    def items_amount(self):
+        return self._objc.numberOfItems()
+        
+    @property
+    def index_of_nowplaying(self):
+        return self ._objc.indexOfNowPlayingItem()
+        
+    def song_at_index(self, index):
+        """The song at index in the play queue, wrapping around, or None if the queue is empty"""
+        count = self.items_amount
+        if not count:
+            return None
+        return Song(self._objc.nowPlayingItemAtIndex_(index % count))
+
+    def song_list(self):
+        return [item.song for item in self.queue_snapshot()]
+
+    def queue_snapshot(self, window=None):
+        """Returns the play queue as a list of QueueItems
+        window: only fetch this many items either side of the now playing item
+        The snapshot is reused until the now playing index or the queue length changes
+        """
+        count = self._objc.numberOfItems()
+        current = self._objc.indexOfNowPlayingItem()
+        key = (count, current, window)
+        if key == self._queue_key:
+            return self._queue
+        if window is None:
+            indexes = range(count)
+        else:
+            # indexOfNowPlayingItem is NSNotFound when nothing is queued
+            center = current if current < count else 0
+            indexes = range(max(0, center - window), min(count, center + window + 1))
+        queue = []
+        for i in indexes:
+            item = self._objc.nowPlayingItemAtIndex_(i)
+            if item:
+                queue += [QueueItem(i, Song.from_values({}, item))]
+        self._queue, self._queue_key = queue, key
+        return queue
+
+    def subscribe(self, callback=None, queue=None, loop=None):
+        """Sends a PlayerEvent when the now playing item or playback state changes
+        callback: called with the event on the thread the notification came in on
+        queue: an asyncio.Queue the event is put on through loop (the current event loop by default)
+        Notifications within the debounce window are coalesced into one event.
+        Returns a subscription to pass to unsubscribe()
+        """
+        if queue is not None and loop is None:
+            loop = asyncio.get_event_loop()
+        subscription = _Subscription(callback, queue, loop)
+        with self._lock:
+            self._subscriptions += [subscription]
+            if not self._observers:
+                self._observe()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.remove(subscription)
+            if not self._subscriptions:
+                self._stop_observing()
+
+    def _observe(self):
+        if self._center is None:
+            self._center = NSNotificationCenter.defaultCenter()
+        self._objc.beginGeneratingPlaybackNotifications()
+        for name, change in _player_notifications.items():
+            block = ObjCBlock(self._notification_handler(change), restype=None, argtypes=[c_void_p, c_void_p])
+            token = self._center.addObserverForName_object_queue_usingBlock_(name, self._objc, None, block)
+            # The block has to outlive the observer
+            self._observers += [(token, block)]
+
+    def _stop_observing(self):
+        for token, block in self._observers:
+            self._center.removeObserver_(token)
+        self._observers = []
+        self._objc.endGeneratingPlaybackNotifications()
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._pending.clear()
+        # Without notifications the anchor would go stale
+        self._anchor = None
+
+    def _notification_handler(self, change):
+        def handler(_cmd, notification):
+            with self._lock:
+                self._pending.add(change)
+                if self._timer or not self.debounce:
+                    flush = not self.debounce
+                else:
+                    self._timer = Timer(self.debounce, self._flush)
+                    self._timer.start()
+                    flush = False
+            if flush:
+                self._flush()
+        return handler
+
+    def _flush(self):
+        with self._lock:
+            changes = frozenset(self._pending)
+            self._pending.clear()
+            self._timer = None
+            subscriptions = list(self._subscriptions)
+        if not changes:
+            return
+        state = self.state
+        playback_time = self.playbackTime
+        self._anchor = (playback_time, monotonic(), self.playbackRate, state)
+        item = self._objc.nowPlayingItem()
+        song = Song.from_values({}, item) if item else None
+        event = PlayerEvent(changes, state, song, playback_time, time())
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+def _chunked(iterable, chunk_size=None):
+    """Passes items through, or groups them into lists of chunk_size if given"""
+    if not chunk_size:
+        for item in iterable:
+            yield item
+        return
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_library(chunk_size=None, query=None):
+    """Yields the items in the music app's library as they are built
+    chunk_size: yield lists of this many songs instead of single songs
+    query: a callable returning the query to run, defaults to MPMediaQuery.songsQuery
+    """
+    query = query() if query else MPMediaQuery.songsQuery()
+    return _chunked((Song(item) for item in query.items()), chunk_size)
+
+
+def library():
+    """Returns all the items in the music app's library"""
+    return list(iter_library())
+    
+
+class LibrarySnapshot (object):
+    """A column-wise copy of the media library
+    String columns are stored as integer codes into a list of interned labels
+    and numeric columns as NumPy arrays, so filtering, sorting and grouping
+    never have to build a Song per row.
+    >>> snap = LibrarySnapshot.from_query()
+    >>> snap.group_by('artist', snap['duration'] * snap['playCount'])
+    """
+    string_columns = ('title', 'artist', 'album', 'genre')
+    numeric_columns = (('duration', np.float64), ('playCount', np.int64),
+                       ('skips', np.int64), ('rating', np.int64),
+                       ('year', np.int64), ('bpm', np.int64),
+                       ('persistentID', np.uint64))
+
+    def __init__(self, columns, labels, items=None):
+        self._columns = columns
+        self._labels = labels
+        self._items = items
+
+    @classmethod
+    def from_items(cls, items):
+        """Extracts the snapshot columns from an iterable of MPMediaItems"""
+        getters = dict(_song_fields)
+        labels = {name: [] for name in cls.string_columns}
+        lookups = {name: {} for name in cls.string_columns}
+        values = {name: [] for name in cls.string_columns}
+        values.update((name, []) for name, dtype in cls.numeric_columns)
+        objects = []
+        for item in items:
+            for name in cls.string_columns:
+                label = getters[name](item)
+                code = lookups[name].get(label)
+                if code is None:
+                    code = lookups[name][label] = len(labels[name])
+                    labels[name].append(intern(label))
+                values[name].append(code)
+            for name, dtype in cls.numeric_columns:
+                values[name].append(getters[name](item) or 0)
+            objects.append(item)
+        columns = {name: np.array(values[name], dtype=np.int32)
+                   for name in cls.string_columns}
+        columns.update((name, np.array(values[name], dtype=dtype))
+                       for name, dtype in cls.numeric_columns)
+        # Filled one by one so numpy never tries to treat an item as a sequence
+        items = np.empty(len(objects), dtype=object)
+        for index, item in enumerate(objects):
+            items[index] = item
+        return cls(columns, labels, items)
+
+    @classmethod
+    def from_query(cls, query=None):
+        """Builds a snapshot from an MPMediaQuery (every song by default)"""
+        if query is None:
+            query = MPMediaQuery.songsQuery()
+        return cls.from_items(query.items())
+
+    def __len__(self):
+        return len(self._columns['persistentID'])
+
+    def __repr__(self):
+        return '<LibrarySnapshot: {} songs>'.format(len(self))
+
+    def __getitem__(self, name):
+        """Returns a column as an array, string columns are decoded to labels"""
+        if name in self._labels:
+            return np.array(self._labels[name], dtype=object)[self._columns[name]]
+        return self._columns[name]
+
+    @property
+    def columns(self):
+        return tuple(self._columns)
+
+    def codes(self, name):
+        """The integer codes of a string column"""
+        return self._columns[name]
+
+    def labels(self, name):
+        """The labels the codes of a string column index into"""
+        return self._labels[name]
+
+    def where(self, name, value):
+        """Returns a boolean mask of the rows where the column equals value"""
+        if name in self._labels:
+            try:
+                value = self._labels[name].index(value)
+            except ValueError:
+                return np.zeros(len(self), dtype=bool)
+        return self._columns[name] == value
+
+    def select(self, rows):
+        """Returns a new snapshot with only the given rows
+        rows can be a boolean mask or an array of indexes
+        """
+        columns = {name: column[rows] for name, column in self._columns.items()}
+        items = self._items[rows] if self._items is not None else None
+        return LibrarySnapshot(columns, self._labels, items)
+
+    def sort(self, name, reverse=False):
+        """Returns a new snapshot sorted by a column"""
+        keys = self._columns[name]
+        if name in self._labels:
+            ranks = np.empty(len(self._labels[name]), dtype=np.int64)
+            ranks[np.argsort(np.array(self._labels[name], dtype=object))] = np.arange(len(ranks))
+            keys = ranks[keys]
+        order = np.argsort(keys, kind='mergesort')
+        if reverse:
+            order = order[::-1]
+        return self.select(order)
+
+    def group_by(self, key, values=None):
+        """Sums values for each label of a string column
+        values can be a column name or an array with one entry per row, if it
+        is None the rows are counted instead.
+        Returns a dict of label: total for every label present
+        """
+        if isinstance(values, str):
+            values = self._columns[values]
+        codes = self._columns[key]
+        labels = self._labels[key]
+        counts = np.bincount(codes, minlength=len(labels))
+        if values is None:
+            totals = counts
+        else:
+            values = np.asarray(values)
+            totals = np.bincount(codes, weights=values, minlength=len(labels))
+            # bincount sums weights as floats, integer columns keep integer totals
+            if values.dtype.kind in 'iub':
+                totals = totals.astype(np.int64)
+        totals = totals.tolist()
+        return {labels[i]: totals[i] for i in np.flatnonzero(counts)}
+
+    def songs(self):
+        """Yields a Song for every row
+        Snapshots loaded from disk have no items, their songs are looked up by persistentID when read
+        """
+        if self._items is None:
+            for pid in self._columns['persistentID'].tolist():
+                yield Song.from_values({'persistentID': pid})
+        else:
+            for item in self._items:
+                yield Song(item)
+
+    def save(self, path, **meta):
+        """Saves the columns to a .npz file, extra keyword arguments are stored alongside them"""
+        arrays = {'column_' + name: column for name, column in self._columns.items()}
+        arrays.update(('labels_' + name, np.array(labels, dtype=str)) for name, labels in self._labels.items())
+        arrays.update(('meta_' + name, np.array(value)) for name, value in meta.items())
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a snapshot saved with save()
+        Returns a tuple of the snapshot and a dict of the extra values saved with it
+        """
+        columns, labels, meta = {}, {}, {}
+        with np.load(path) as data:
+            for name in data.files:
+                kind, key = name.split('_', 1)
+                if kind == 'column':
+                    columns[key] = data[name]
+                elif kind == 'labels':
+                    labels[key] = [intern(label) for label in data[name].tolist()]
+                else:
+                    meta[key] = data[name].item()
+        return cls(columns, labels), meta
+
+
+def item_for_persistent_id(pid):
+    """Returns the MPMediaItem with a persistentID or None if it isn't in the library"""
+    query = MPMediaQuery.songsQuery()
+    # Passed as an NSNumber explicitly, persistentIDs don't fit the default conversion
+    value = NSNumber.numberWithUnsignedLongLong_(pid)
+    query.addFilterPredicate_(MPMediaPropertyPredicate.predicateWithValue_forProperty_(value, 'persistentID'))
+    items = query.items()
+    return items[0] if len(items) else None
+
+
+def _library_modified(library):
+    return float(library.lastModifiedDate().timeIntervalSince1970())
+
+
+def _signed(pid):
+    # persistent ids are unsigned 64 bit but SQLite integers are signed
+    return pid - (1 << 64) if pid >= (1 << 63) else pid
+
+
+def _unsigned(pid):
+    return pid + (1 << 64) if pid < 0 else pid
+
+
+class LibraryCache (object):
+    """A persistent copy of the extracted song fields
+    The fields are stored in SQLite keyed by persistentID and thrown away
+    whenever the media library's lastModifiedDate changes, so a warm start
+    never has to go over the bridge for every song.
+
+    path: the database file, defaults to .music_cache.sqlite in Documents
+    library: an MPMediaLibrary, defaults to the device's library
+    query: a callable returning the query to rebuild from, defaults to MPMediaQuery.songsQuery
+    >>> cache = LibraryCache()
+    >>> songs = cache.load()
+    >>> cache.stats
+    """
+    # assetURL is an NSURL so it is left to be fetched lazily
+    fields = tuple(name for name in Song.fields if name != 'assetURL')
+    _bool_fields = ('inLibrary', 'compolation', 'cloud')
+    # Unsigned 64 bit ids that have to be shifted into SQLite's signed range
+    _id_fields = ('persistentID', 'albumPersistentID')
+
+    def __init__(self, path=None, library=None, query=None):
+        if path is None:
+            path = os_path.join(os_path.expanduser('~/Documents'), '.music_cache.sqlite')
+        self.path = path
+        self._library = library
+        self._query = query
+        self.hits = 0
+        self.misses = 0
+        self.loadTime = None
+
+    def __repr__(self):
+        return '<LibraryCache: {} (Hits: {}, Misses: {})>'.format(self.path, self.hits, self.misses)
+
+    @property
+    def library(self):
+        if self._library is None:
+            self._library = MPMediaLibrary.defaultMediaLibrary()
+        return self._library
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'loadTime': self.loadTime}
+
+    def modified(self):
+        """The library's lastModifiedDate as a unix timestamp"""
+        return _library_modified(self.library)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)')
+        return db
+
+    def _is_valid(self, db, modified):
+        meta = dict(db.execute('SELECT key, value FROM meta'))
+        return meta.get('modified') == modified and meta.get('fields') == ','.join(self.fields)
+
+    def load(self, refresh=False):
+        """Returns every song in the library, from the cache if it is still valid
+        refresh: ignore the cache and rebuild it from the library
+        """
+        start = time()
+        modified = self.modified()
+        db = self._connect()
+        try:
+            if not refresh and self._is_valid(db, modified):
+                self.hits += 1
+                songs = self._read(db)
+            else:
+                self.misses += 1
+                songs = self._rebuild(db, modified)
+        finally:
+            db.close()
+        self.loadTime = time() - start
+        return songs
+
+    def refresh(self):
+        """Rebuilds the cache from the library"""
+        return self.load(refresh=True)
+
+    def clear(self):
+        db = self._connect()
+        with db:
+            db.execute('DROP TABLE IF EXISTS songs')
+            db.execute('DELETE FROM meta')
+        db.close()
+
+    def _read(self, db):
+        songs = []
+        for row in db.execute('SELECT {} FROM songs ORDER BY position'.format(', '.join(self.fields))):
+            values = dict(zip(self.fields, row))
+            for name in self._bool_fields:
+                values[name] = bool(values[name])
+            for name in self._id_fields:
+                values[name] = _unsigned(values[name])
+            songs += [Song.from_values(values)]
+        return songs
+
+    def _rebuild(self, db, modified):
+        query = self._query() if self._query else MPMediaQuery.songsQuery()
+        songs = [Song(item).prefetch(self.fields) for item in query.items()]
+        columns = [name for name in self.fields if name != 'persistentID']
+        rows = ([_signed(song.persistentID), position] + [self._column(song, name) for name in columns]
+                for position, song in enumerate(songs))
+        with db:
+            db.execute('DROP TABLE IF EXISTS songs')
+            db.execute('CREATE TABLE songs (persistentID INTEGER PRIMARY KEY, position INTEGER, {})'.format(', '.join(columns)))
+            db.executemany('INSERT OR REPLACE INTO songs (persistentID, position, {}) VALUES ({})'.format(
+                ', '.join(columns), ', '.join('?' * (len(columns) + 2))), rows)
+            db.execute('DELETE FROM meta')
+            db.executemany('INSERT INTO meta VALUES (?, ?)', [('modified', modified), ('fields', ','.join(self.fields))])
+        return songs
+
+    def _column(self, song, name):
+        value = getattr(song, name)
+        return _signed(value) if name in self._id_fields else value
+
+
+class LibraryChange (IntEnum):
+    Added = 0
+    Removed = 1
+    Modified = 2
+
+
+# song is None for removed songs since their item is gone
+LibraryEvent = namedtuple('LibraryEvent', ['change', 'persistentID', 'song'])
+
+
+def _fingerprint(item):
+    played = item.lastPlayedDate()
+    played = played.timeIntervalSince1970() if played else None
+    return hash((played, item.playCount(), item.rating()))
+
+
+class LibraryWatcher (object):
+    """Tracks the library between refreshes and reports only what changed
+    Each song is remembered by its persistentID and a hash of its
+    lastPlayedDate, playCount and rating.
+
+    query: a callable returning the query to scan, defaults to MPMediaQuery.songsQuery
+    library: an MPMediaLibrary, used to skip the scan when lastModifiedDate is unchanged
+    >>> watcher = LibraryWatcher()
+    >>> watcher.prime()
+    >>> for event in watcher.refresh():
+    ...     print(event.change, event.song)
+    """
+    def __init__(self, query=None, library=None):
+        self._query = query
+        self._library = library
+        self._fingerprints = {}
+        self._modified = None
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def __repr__(self):
+        return '<LibraryWatcher: {} songs>'.format(len(self))
+
+    @property
+    def library(self):
+        if self._library is None:
+            self._library = MPMediaLibrary.defaultMediaLibrary()
+        return self._library
+
+    def prime(self):
+        """Records the current library without reporting it as added"""
+        for event in self.refresh():
+            pass
+
+    def refresh(self, force=False):
+        """Yields a LibraryEvent for every song added, removed or modified since the last refresh
+        The new state is only kept once the generator is exhausted, so stopping
+        early means the same changes are reported again next time.
+        force: scan even if the library's lastModifiedDate hasn't changed
+        """
+        modified = _library_modified(self.library)
+        if modified == self._modified and not force:
+            return
+        query = self._query() if self._query else MPMediaQuery.songsQuery()
+        previous = self._fingerprints
+        current = {}
+        for item in query.items():
+            pid = int(item.persistentID())
+            fingerprint = current[pid] = _fingerprint(item)
+            old = previous.get(pid)
+            if old is None:
+                yield LibraryEvent(LibraryChange.Added, pid, Song.from_values({'persistentID': pid}, item))
+            elif old != fingerprint:
+                yield LibraryEvent(LibraryChange.Modified, pid, Song.from_values({'persistentID': pid}, item))
+        for pid in previous:
+            if pid not in current:
+                yield LibraryEvent(LibraryChange.Removed, pid, None)
+        self._fingerprints = current
+        self._modified = modified
+
+
+def iter_playlists(chunk_size=None, query=None):
+    """Yields the playlists as they are built
+    chunk_size: yield lists of this many playlists instead of single ones
+    query: a callable returning the query to run, defaults to MPMediaQuery.playlistsQuery
+    """
+    query = query() if query else MPMediaQuery.playlistsQuery()
+    return _chunked((Playlist(i) for i in query.collections()), chunk_size)
+
+
+def playlists():
+    returns = list(iter_playlists())
+    if len(returns) < 1:
+        raise ValueError("No Playlists")
+    return returns
+
+
+_featuring = re.compile(r'\s*[\(\[]\s*(feat|ft|featuring|with)\b[^\)\]]*[\)\]]')
+_featured_artist = re.compile(r'\s+(feat|ft|featuring)\b.*$')
+_bracketed = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]')
+_non_word = re.compile(r'[\W_]+')
+_filler_words = frozenset(('the', 'a', 'an', 'and'))
+
+
+def _normalize(text, fuzzy=False, artist=False):
+    """Lowercases text and strips accents, punctuation and featured artists
+    fuzzy also drops anything in brackets and filler words and ignores word order
+    """
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = _featuring.sub('', text)
+    if artist:
+        text = _featured_artist.sub('', text)
+    if fuzzy:
+        text = _bracketed.sub('', text)
+    words = _non_word.sub(' ', text).split()
+    if fuzzy:
+        words = sorted(word for word in words if word not in _filler_words)
+    return ' '.join(words)
+
+
+def find_duplicates(songs=None, tolerance_seconds=2, fuzzy=False):
+    """Finds songs with the same title and artist and durations within tolerance_seconds
+    Songs are bucketed by their normalized title and artist, then each bucket
+    is swept in duration order, so only title, artist and duration are read.
+    songs: the songs to check, defaults to the whole library
+    fuzzy: also ignore bracketed text ("(Remastered)"), filler words and word order
+    Returns a list of groups, each a list of two or more songs
+    """
+    if songs is None:
+        songs = iter_library()
+    buckets = {}
+    for song in songs:
+        key = (_normalize(song.title, fuzzy), _normalize(song.artist, fuzzy, artist=True))
+        buckets.setdefault(key, []).append(song)
+    groups = []
+    for bucket in buckets.values():
+        if len(bucket) < 2:
+            continue
+        bucket.sort(key=lambda song: song.duration)
+        group = [bucket[0]]
+        for song in bucket[1:]:
+            if song.duration - group[0].duration <= tolerance_seconds:
+                group.append(song)
+            else:
+                if len(group) > 1:
+                    groups.append(group)
+                group = [song]
+        if len(group) > 1:
+            groups.append(group)
+    return groups
+
+
+def auth_status():
+    if iOS_version < 9.3:
+        raise OSError("Not needed before iOS 9.3")
+        return True
+    else:
+        status = MPMediaLibrary.authorizationStatus()
+        
+        class AuthStatus (IntEnum):
+            Unknown = 0
+            Denied = 1
+            Restricted = 2
+            Authorized = 3
+        return AuthStatus(status)
+            
+
+def canFilter(key):
+    return MPMediaItem.canFilterByProperty_(key)
+    
+
+def songlist_to_array(songs, cache=None):
+    """Returns an NSArray of the songs' items
+    cache: a dict owned by the caller, if it was last passed with the same
+    items the NSArray made then is returned instead of a new one
+    """
+    objcitems = [i._objc for i in songs]
+    if cache is not None:
+        last_items = cache.get('items', ())
+        if len(objcitems) == len(last_items) and all(a is b for a, b in zip(objcitems, last_items)):
+            return cache['array']
+    array = ns(objcitems)
+    if cache is not None:
+        cache['items'], cache['array'] = objcitems, array
+    return array
+    
+if __name__ == '__main__':
+    p = playlists()[0]
+    n = NowPlayingController()
@@ -1,7 +1,19 @@
 from objc_util import ObjCClass, nsdata_to_bytes
+from datetime import datetime
+from base64 import b64encode
 import json
+from objc_tools.objchandler import dict_items
 
 NSJSONSerialization = ObjCClass('NSJSONSerialization')
+NSString = ObjCClass('NSString')
+NSNumber = ObjCClass('NSNumber')
+NSDictionary = ObjCClass('NSDictionary')
+NSArray = ObjCClass('NSArray')
+NSSet = ObjCClass('NSSet')
+NSDate = ObjCClass('NSDate')
+NSData = ObjCClass('NSData')
+NSNull = ObjCClass('NSNull')
+CFBoolean = ObjCClass('__NSCFBoolean')
 
 def checkObject(objc):
     return NSJSONSerialization.isValidJSONObject_(objc)
@@ -16,8 +28,203 @@ def objc_to_str(objc, pretty=True):
     
 
 def objc_to_py(objc):
-    if checkObject(objc):
-        return json.loads(objc_to_str(objc))
-    else:
-        raise TypeError("Objc object can't be converted")
+    return objc_to_native(objc)
+
+
+def _number(objc):
+    if objc.isKindOfClass_(CFBoolean):
+        return bool(objc.boolValue())
+    kind = objc.objCType()
+    if kind in (b'f', b'd'):
+        return objc.doubleValue()
+    if kind == b'Q':
+        return objc.unsignedLongLongValue()
+    return objc.longLongValue()
+
+
+def _identity(objc):
+    ptr = getattr(objc, 'ptr', None)
+    if ptr is None:
+        return id(objc)
+    return getattr(ptr, 'value', ptr)
+
+
+def _scalar(objc):
+    if objc.isKindOfClass_(NSString):
+        return str(objc)
+    if objc.isKindOfClass_(NSNumber):
+        return _number(objc)
+    if objc.isKindOfClass_(NSDate):
+        return datetime.fromtimestamp(objc.timeIntervalSince1970())
+    if objc.isKindOfClass_(NSData):
+        return nsdata_to_bytes(objc)
+    if objc.isKindOfClass_(NSNull):
         return None
+    raise TypeError("Objc object can't be converted")
+
+
+def _dict_children(objc):
+    keys, values = dict_items(objc)
+    for key, value in zip(keys, values):
+        yield objc_to_native(key), value
+
+
+def _list_children(objc):
+    for item in objc:
+        yield None, item
+
+
+def _visit(objc, cache, active):
+    """Converts objc, for collections returns an empty container and a frame to fill it from"""
+    if objc is None or isinstance(objc, (str, int, float, bool, bytes)):
+        return objc, None
+    ident = _identity(objc)
+    if ident in active:
+        raise ValueError('Objc object contains a cycle')
+    if ident in cache:
+        return cache[ident], None
+    if objc.isKindOfClass_(NSDictionary):
+        value, children = {}, _dict_children(objc)
+    elif objc.isKindOfClass_(NSArray):
+        value, children = [], _list_children(objc)
+    elif objc.isKindOfClass_(NSSet):
+        value, children = [], _list_children(objc.allObjects())
+    else:
+        value = cache[ident] = _scalar(objc)
+        return value, None
+    cache[ident] = value
+    active.add(ident)
+    return value, (ident, value, children)
+
+
+def objc_to_native(objc):
+    '''Converts Foundation objects straight to Python ones without going through JSON
+    NSDate becomes a datetime, NSData bytes and NSNull None.
+    Collections are walked with a stack rather than recursion so deep ones
+    are fine, an object found inside itself raises a ValueError and an object
+    that appears more than once is only converted once.
+    '''
+    cache = {}
+    active = set()
+    root, frame = _visit(objc, cache, active)
+    stack = [frame] if frame else []
+    while stack:
+        ident, container, children = stack[-1]
+        for key, child in children:
+            value, frame = _visit(child, cache, active)
+            if key is None:
+                container.append(value)
+            else:
+                container[key] = value
+            if frame:
+                stack.append(frame)
+                break
+        else:
+            stack.pop()
+            active.discard(ident)
+    return root
+
+
+def _json_scalar(value):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, bytes):
+        value = b64encode(value).decode('ascii')
+    return json.dumps(value)
+
+
+def _key_children(objc):
+    keys = objc.keyEnumerator()
+    key = keys.nextObject()
+    while key is not None:
+        yield objc_to_native(key), objc.objectForKey_(key)
+        key = keys.nextObject()
+
+
+class _JSONFrame (object):
+    __slots__ = ('ident', 'closing', 'children', 'isDict', 'count')
+
+    def __init__(self, ident, closing, children, isDict):
+        self.ident = ident
+        self.closing = closing
+        self.children = children
+        self.isDict = isDict
+        self.count = 0
+
+
+def _json_open(objc, active):
+    """Returns the JSON for a scalar, or the opening bracket and a frame for a collection"""
+    if objc is None or isinstance(objc, (str, int, float, bool, bytes)):
+        return _json_scalar(objc), None
+    ident = _identity(objc)
+    if ident in active:
+        raise ValueError('Objc object contains a cycle')
+    if objc.isKindOfClass_(NSDictionary):
+        frame = _JSONFrame(ident, '}', _key_children(objc), True)
+        opening = '{'
+    elif objc.isKindOfClass_(NSArray):
+        frame = _JSONFrame(ident, ']', _list_children(objc), False)
+        opening = '['
+    elif objc.isKindOfClass_(NSSet):
+        frame = _JSONFrame(ident, ']', _list_children(objc.allObjects()), False)
+        opening = '['
+    else:
+        return _json_scalar(_scalar(objc)), None
+    active.add(ident)
+    return opening, frame
+
+
+def _iter_json(objc):
+    '''Yields the JSON for objc a piece at a time'''
+    active = set()
+    text, frame = _json_open(objc, active)
+    yield text
+    stack = [frame] if frame else []
+    while stack:
+        frame = stack[-1]
+        for key, child in frame.children:
+            if frame.count:
+                yield ','
+            frame.count += 1
+            if frame.isDict:
+                yield json.dumps(str(key)) + ':'
+            text, child_frame = _json_open(child, active)
+            yield text
+            if child_frame:
+                stack.append(child_frame)
+                break
+        else:
+            stack.pop()
+            active.discard(frame.ident)
+            yield frame.closing
+
+
+def _chain_line(item):
+    for piece in _iter_json(item):
+        yield piece
+    yield '\n'
+
+
+def dump(objc, fp, chunk_size=65536, lines=False):
+    '''Writes objc as JSON to the file object fp without building the whole document
+    The collection is walked a piece at a time and written out whenever
+    chunk_size characters are waiting, so memory use doesn't grow with the
+    number of elements. NSDate is written as an ISO 8601 string and NSData
+    as base64.
+    lines: write a top level array as JSON Lines, one element per line
+    '''
+    buffered = []
+    size = 0
+    if lines and objc.isKindOfClass_(NSArray):
+        pieces = (piece for item in objc for piece in _chain_line(item))
+    else:
+        pieces = _iter_json(objc)
+    for piece in pieces:
+        buffered.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            fp.write(''.join(buffered))
+            buffered = []
+            size = 0
+    if buffered:
+        fp.write(''.join(buffered))
@@ -1,10 +1,41 @@
-from objc_util import ObjCInstance, nsurl, NSURL, NSString
+from objc_util import ObjCInstance, nsurl, NSURL, NSString, sel
+from ctypes import c_void_p, c_ulong
 
-def objcDict(objcd):
-    returns = []
-    for i in zip(objcd.allKeys(), objcd.allValues()):
-        returns += [{i[0], i[1]}]
-    return returns
+# getObjects:andKeys:count: is iOS 11+, checked on the first dictionary
+_has_count_selector = None
+
+
+def dict_items(objcd):
+    '''Returns the keys and values of an NSDictionary as two lists of ObjCInstances
+    Both are copied out in a single getObjects:andKeys:count: call, or
+    getObjects:andKeys: before iOS 11
+    '''
+    global _has_count_selector
+    count = objcd.count()
+    if not count:
+        return [], []
+    keys = (c_void_p * count)()
+    values = (c_void_p * count)()
+    if _has_count_selector is None:
+        _has_count_selector = bool(objcd.respondsToSelector_(sel('getObjects:andKeys:count:')))
+    if _has_count_selector:
+        objcd.getObjects_andKeys_count_(values, keys, count, argtypes=[c_void_p, c_void_p, c_ulong], restype=None)
+    else:
+        objcd.getObjects_andKeys_(values, keys, argtypes=[c_void_p, c_void_p], restype=None)
+    return [ObjCInstance(i) for i in keys], [ObjCInstance(i) for i in values]
+
+
+def objcDict(objcd, recursive=False):
+    '''Converts an NSDictionary to a dict
+    The keys are converted to Python objects and the values are left as
+    ObjCInstances unless recursive is set, then they are converted too.
+    '''
+    # Imported here since objc_json uses dict_items
+    from objc_tools.objc_json import objc_to_native
+    if recursive:
+        return objc_to_native(objcd)
+    keys, values = dict_items(objcd)
+    return dict(zip([objc_to_native(key) for key in keys], values))
 
 
     
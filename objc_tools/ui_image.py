@@ -1,18 +1,41 @@
 from objc_util import ObjCInstance, c, c_void_p
-from ctypes import c_double
+from ctypes import c_char
 from io import BytesIO
-from base64 import decodestring
+from concurrent.futures import ThreadPoolExecutor
 
 UIImagePNGRepresentation = c.UIImagePNGRepresentation
 UIImagePNGRepresentation.restype = c_void_p
 UIImagePNGRepresentation.argtypes = [c_void_p]
 
 
+def nsdata_view(data):
+    '''Returns a memoryview over the bytes of an NSData without copying them
+    The view keeps the NSData alive for as long as it is used
+    '''
+    length = data.length()
+    if not length:
+        return memoryview(b'')
+    buffer = (c_char * length).from_address(data.bytes())
+    buffer._nsdata = data
+    return memoryview(buffer).cast('B')
+
+
+def png_view(img):
+    '''A memoryview of the PNG data for a UIImage'''
+    return nsdata_view(png_rep(img))
+
+
 def png_buffer(img):
-    data=ObjCInstance(UIImagePNGRepresentation(img))
-    b64 = decodestring(data.base64EncodedString().cString())
-    buffer = BytesIO(b64)
-    return buffer
+    return BytesIO(png_view(img))
+
+
+def png_buffers(images, workers=4):
+    '''Converts many UIImages to PNG buffers concurrently
+    Returns the buffers in the same order as images
+    '''
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(png_buffer, images))
+
 
 def png_rep(img):
     return ObjCInstance(UIImagePNGRepresentation(img))
@@ -0,0 +1,97 @@
+'''Fake LaunchServices objects for the apps tests'''
+from nsfakes import String, Dictionary
+
+
+class Number (object):
+    def __init__(self, value):
+        self.value = value
+
+    def intValue(self):
+        return self.value
+
+    def integerValue(self):
+        return self.value
+
+
+class Plist (dict):
+    '''An Info.plist, also standing in for the _infoDictionary holding it'''
+    def objectForKey_(self, key):
+        return self.get(key)
+
+    def propertyList(self):
+        return self
+
+
+class InfoDictionary (object):
+    '''An _infoDictionary holding a Foundation plist'''
+    def __init__(self, plist):
+        self.plist = plist
+
+    def propertyList(self):
+        return self.plist
+
+
+class Proxy (object):
+    '''An LSApplicationProxy, every getter call is counted in Proxy.calls'''
+    calls = 0
+
+    def __init__(self, i, **values):
+        self.values = dict(applicationIdentifier='com.app{}'.format(i), appTags=[], bundleModTime=0.0,
+                           deviceFamily=[Number(1)], localizedName='App {}'.format(i),
+                           vendorName='V{}'.format(i % 3), teamID='T{}'.format(i % 4),
+                           bundleType='User' if i % 2 else 'System', bundleVersion='1.{}'.format(i),
+                           shortVersionString='1', signerIdentity='S', isBetaApp=False,
+                           _infoDictionary=Plist(CFBundleURLTypes=[Plist(CFBundleURLSchemes=['s{}'.format(i), 'x{}'.format(i % 2)])]),
+                           staticDiskUsage=Number(1000 * i), dynamicDiskUsage=Number(10 * i),
+                           UIBackgroundModes=['audio'] if i % 5 == 0 else None,
+                           entitlements=Dictionary({String('aps-environment'): String('production')} if i % 2 else {}))
+        self.values.update(values)
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name not in self.values:
+            raise AttributeError(name)
+
+        def getter(*args):
+            Proxy.calls += 1
+            return self.values[name]
+        return getter
+
+
+class Workspace (object):
+    '''An LSApplicationWorkspace over a list of proxies
+    Every proxy's declared schemes are public, opened by the first app declaring
+    them. unopened lists more public schemes that no app opens.
+    '''
+    def __init__(self, count):
+        self.proxies = [Proxy(i) for i in range(count)]
+        self.unopened = []
+        self.enumerations = 0
+        self.observers = []
+
+    def allInstalledApplications(self):
+        self.enumerations += 1
+        return list(self.proxies)
+
+    def addObserver_(self, observer):
+        self.observers.append(observer)
+
+    def removeObserver_(self, observer):
+        self.observers.remove(observer)
+
+    def _declared(self, proxy):
+        return [scheme for urltype in proxy.values['_infoDictionary']['CFBundleURLTypes']
+                for scheme in urltype['CFBundleURLSchemes']]
+
+    def publicURLSchemes(self):
+        schemes = []
+        for proxy in self.proxies:
+            schemes += [scheme for scheme in self._declared(proxy) if scheme not in schemes]
+        return schemes + self.unopened
+
+    def applicationForOpeningResource_(self, url):
+        Proxy.calls += 1
+        scheme = url.split(':')[0]
+        for proxy in self.proxies:
+            if scheme in self._declared(proxy):
+                return proxy
+        return None
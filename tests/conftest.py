@@ -0,0 +1,7 @@
+import sys
+from os import path as os_path
+
+# objc_util is only available in Pythonista, the stub next to this file is
+# imported in its place and objc_tools is imported from the checkout
+sys.path.insert(0, os_path.dirname(os_path.dirname(os_path.abspath(__file__))))
+sys.path.insert(0, os_path.dirname(os_path.abspath(__file__)))
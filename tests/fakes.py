@@ -0,0 +1,199 @@
+'''Fake MediaPlayer objects for the music tests'''
+import threading
+from objc_util import pointer
+
+
+class Item (object):
+    '''An MPMediaItem, every getter call is counted in Item.calls'''
+    calls = 0
+
+    def __init__(self, pid, **values):
+        self.values = dict(title='T{}'.format(pid), artist='A{}'.format(pid % 7), albumTitle='Al{}'.format(pid % 13),
+                           genre='G{}'.format(pid % 3), playbackDuration=100.0 + pid % 50, playCount=pid % 11,
+                           skipCount=pid % 4, rating=pid % 6, year=1960 + pid % 60, beatsPerMinute=0,
+                           persistentID=pid, albumPersistentID=1000 + pid % 13, lyrics='', composer='C',
+                           albumArtist='AA', comments='', existsInLibrary=True, isCompilation=False,
+                           isCloudItem=False, albumTrackNumber=1, discNumber=1, assetURL=None, lastPlayedDate=None)
+        self.values.update(values)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name not in self.values:
+            raise AttributeError(name)
+
+        def getter(*args):
+            Item.calls += 1
+            return self.values[name]
+        return getter
+
+
+class Query (object):
+    '''An MPMediaQuery over a list of items'''
+    def __init__(self, items):
+        self._items = items
+
+    def items(self):
+        return list(self._items)
+
+
+class _Date (object):
+    def __init__(self, timestamp):
+        self.timestamp = timestamp
+
+    def timeIntervalSince1970(self):
+        return self.timestamp
+
+
+class Library (object):
+    '''An MPMediaLibrary, bump modified to simulate a change'''
+    def __init__(self, modified=1.0):
+        self.modified = modified
+
+    def lastModifiedDate(self):
+        return _Date(self.modified)
+
+
+def library(count):
+    return [Item(pid) for pid in range(count)]
+
+
+class Player (object):
+    '''An MPMusicPlayerController playing a queue of items
+    Every call is counted in Player.calls.
+    '''
+    calls = 0
+
+    def __init__(self, items, index=0, state=1, time=10.0, rate=1.0):
+        self.items = items
+        self.index = index
+        self.state = state
+        self.time = time
+        self.rate = rate
+        self.generating = False
+
+    def _call(self, value):
+        Player.calls += 1
+        return value
+
+    def numberOfItems(self):
+        return self._call(len(self.items))
+
+    def indexOfNowPlayingItem(self):
+        # NSNotFound when nothing is queued
+        return self._call(self.index if self.items else 2 ** 63 - 1)
+
+    def nowPlayingItemAtIndex_(self, index):
+        return self._call(self.items[index] if 0 <= index < len(self.items) else None)
+
+    def nowPlayingItem(self):
+        return self._call(self.items[self.index] if self.items else None)
+
+    def playbackState(self):
+        return self._call(self.state)
+
+    def currentPlaybackTime(self):
+        return self._call(self.time)
+
+    def setCurrentPlaybackTime_(self, time):
+        self.time = self._call(time)
+
+    def currentPlaybackRate(self):
+        return self._call(self.rate)
+
+    def setCurrentPlaybackRate_(self, rate):
+        self.rate = self._call(rate)
+
+    def beginGeneratingPlaybackNotifications(self):
+        self.generating = True
+
+    def endGeneratingPlaybackNotifications(self):
+        self.generating = False
+
+
+class NotificationCenter (object):
+    '''An NSNotificationCenter holding one observer block per name'''
+    def __init__(self):
+        self.observers = {}
+
+    def addObserverForName_object_queue_usingBlock_(self, name, obj, queue, block):
+        self.observers[name] = block
+        return name
+
+    def removeObserver_(self, token):
+        del self.observers[token]
+
+    def post(self, name):
+        self.observers[name](None)
+
+
+class Error (object):
+    '''An NSError'''
+    def __init__(self, description, code=1):
+        self.description = description
+        self.errorCode = code
+
+    def localizedDescription(self):
+        return self.description
+
+    localizedRecoverySuggestion = localizedFailureReason = localizedRecoveryOptions = localizedDescription
+
+    def userInfo(self):
+        return None
+
+    def domain(self):
+        return 'MPErrorDomain'
+
+    def code(self):
+        return self.errorCode
+
+
+class Playlist (object):
+    '''An MPMediaPlaylist whose addItems:completionHandler: calls finish on a thread
+    results: what each add does in turn, 'ok', 'hang' (never completes) or an Error
+    '''
+    def __init__(self, name='Playlist', results=()):
+        self.playlist_name = name
+        self.items = []
+        self.added = []
+        self.results = list(results)
+
+    def name(self):
+        return self.playlist_name
+
+    def isCloudMix(self):
+        return False
+
+    def existsInLibrary(self):
+        return True
+
+    def descriptionText(self):
+        return ''
+
+    def authorDisplayName(self):
+        return ''
+
+    def count(self):
+        return len(self.items)
+
+    def addItems_completionHandler_(self, array, block):
+        result = self.results.pop(0) if self.results else 'ok'
+        self.added.append(array)
+        if result == 'hang':
+            return
+        if result == 'ok':
+            self.items += list(array)
+            error = None
+        else:
+            error = pointer(result)
+        threading.Thread(target=block, args=(error,)).start()
+
+
+class Catalog (object):
+    '''An MPMediaItemArtwork catalog, every image read is counted in Catalog.reads'''
+    reads = 0
+
+    def __init__(self, image):
+        self.image = image
+
+    def bestImageFromDisk(self):
+        Catalog.reads += 1
+        return self.image
@@ -0,0 +1,99 @@
+'''Fake Foundation objects for the conversion tests'''
+from objc_util import pointer
+
+
+class NSObject (object):
+    # The ObjC class names isKindOfClass_ is true for
+    kinds = ()
+
+    def isKindOfClass_(self, cls):
+        return cls.name in self.kinds
+
+
+class String (NSObject):
+    kinds = ('NSString',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return self.value
+
+
+class Number (NSObject):
+    kinds = ('NSNumber',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def objCType(self):
+        return b'd' if isinstance(self.value, float) else b'q'
+
+    def doubleValue(self):
+        return self.value
+
+    def longLongValue(self):
+        return self.value
+
+
+class Bool (Number):
+    kinds = ('NSNumber', '__NSCFBoolean')
+
+    def boolValue(self):
+        return self.value
+
+
+class Null (NSObject):
+    kinds = ('NSNull',)
+
+
+class Array (NSObject):
+    kinds = ('NSArray',)
+
+    def __init__(self, items):
+        self.items = items
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+class Dictionary (NSObject):
+    '''An NSDictionary on iOS 11 and later'''
+    kinds = ('NSDictionary',)
+
+    def __init__(self, items):
+        self.items = items
+
+    def count(self):
+        return len(self.items)
+
+    def respondsToSelector_(self, selector):
+        return getattr(self, selector.replace(':', '_'), None) is not None
+
+    def getObjects_andKeys_count_(self, values, keys, count, argtypes=None, restype=None):
+        for i, (key, value) in enumerate(self.items.items()):
+            keys[i], values[i] = pointer(key), pointer(value)
+
+    def keyEnumerator(self):
+        return Enumerator(self.items)
+
+    def objectForKey_(self, key):
+        return self.items[key]
+
+
+class Enumerator (object):
+    '''An NSEnumerator, nextObject returns None once it runs out'''
+    def __init__(self, items):
+        self._items = iter(items)
+
+    def nextObject(self):
+        return next(self._items, None)
+
+
+class OldDictionary (Dictionary):
+    '''An NSDictionary before iOS 11, without getObjects:andKeys:count:'''
+    getObjects_andKeys_count_ = None
+
+    def getObjects_andKeys_(self, values, keys, argtypes=None, restype=None):
+        for i, (key, value) in enumerate(self.items.items()):
+            keys[i], values[i] = pointer(key), pointer(value)
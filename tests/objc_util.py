@@ -0,0 +1,103 @@
+'''A stand-in for Pythonista's objc_util so objc_tools can be imported off device
+ObjC classes and everything they return are inert stubs. The tests pass their
+own fakes through the injection points (query=, library=, workspace=, ...).
+'''
+from ctypes import c_void_p
+from collections import namedtuple
+
+_OSVersion = namedtuple('_OSVersion', ['a', 'b', 'c'])
+# Objects handed out as pointers, so ObjCInstance(pointer) finds them again
+_objects = {}
+
+
+class _Stub (object):
+    '''Any attribute is another stub and calling one returns a stub'''
+    def __init__(self, name='stub'):
+        self.name = name
+
+    def __repr__(self):
+        return '<stub {}>'.format(self.name)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _Stub(name)
+
+    def __call__(self, *args, **kwargs):
+        return _Stub(self.name)
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __bool__(self):
+        return False
+
+    def operatingSystemVersion(self):
+        # Version checks take the iOS 10 paths
+        return _OSVersion(10, 3, 0)
+
+
+def pointer(obj):
+    '''Registers obj and returns an address ObjCInstance turns back into it'''
+    _objects[id(obj)] = obj
+    return id(obj)
+
+
+class ObjCInstance (object):
+    def __new__(cls, ptr=None):
+        if isinstance(ptr, c_void_p):
+            ptr = ptr.value
+        if ptr in _objects:
+            return _objects[ptr]
+        return object.__new__(cls)
+
+    def __init__(self, ptr=None):
+        self.ptr = ptr
+
+
+class ObjCBlock (object):
+    def __init__(self, func, restype=None, argtypes=None):
+        self.func = func
+        self.restype = restype
+        self.argtypes = argtypes
+
+    def __call__(self, *args):
+        return self.func(None, *args)
+
+
+def ObjCClass(name):
+    return _Stub(name)
+
+
+def create_objc_class(name, superclass=None, methods=[], classmethods=[], protocols=[], debug=True):
+    return _Stub(name)
+
+
+def sel(name):
+    return name
+
+
+def ns(obj):
+    return obj
+
+
+def nsurl(url):
+    return url
+
+
+def nsdata_to_bytes(data):
+    return bytes(data)
+
+
+def uiimage_to_png(image):
+    return image.png
+
+
+c = _Stub('c')
+NSBundle = ObjCClass('NSBundle')
+NSString = ObjCClass('NSString')
+NSURL = ObjCClass('NSURL')
+UIImage = ObjCClass('UIImage')
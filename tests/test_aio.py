@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import pytest
+from objc_tools import aio
+
+
+@pytest.fixture(autouse=True)
+def pending():
+    aio._pending.clear()
+    yield aio._pending
+    aio._pending.clear()
+
+
+class Service (object):
+    '''An ObjC API calling its completion handler on a background thread
+    Every request is answered after delay seconds unless hang is set.
+    '''
+    def __init__(self, delay=0.01, hang=False):
+        self.delay = delay
+        self.hang = hang
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def request_(self, value, block):
+        with self.lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        if self.hang:
+            return
+        thread = threading.Timer(self.delay, self._finish, (block, value))
+        self.threads.append(thread)
+        thread.start()
+
+    def _finish(self, block, value):
+        with self.lock:
+            self.in_flight -= 1
+        block(value * 2)
+
+    def pair_(self, value, block):
+        threading.Thread(target=block, args=(value, None)).start()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+
+def test_call_resolves_from_another_thread(pending):
+    service = Service()
+    assert asyncio.run(aio.call(service.request_, 21)) == 42
+    assert not pending
+
+
+def test_call_with_several_handler_arguments():
+    service = Service()
+    assert asyncio.run(aio.call(service.pair_, 'x', argtypes=[None] * 3)) == ('x', None)
+
+
+def test_call_that_raises_is_not_kept(pending):
+    def method(block):
+        raise RuntimeError('no')
+    with pytest.raises(RuntimeError):
+        asyncio.run(aio.call(method))
+    assert not pending
+
+
+def test_timeout_keeps_the_block_alive(pending):
+    service = Service(hang=True)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(aio.call(service.request_, 1, timeout=0.05))
+    completion, = pending
+    # ObjC may still call the block after the caller has given up
+    completion.handler(None, 1)
+    assert not pending
+
+
+def test_late_handler_after_cancelling():
+    service = Service(delay=0.2)
+
+    async def main():
+        task = asyncio.ensure_future(aio.call(service.request_, 1))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The handler still fires and must not resolve the cancelled future
+        await asyncio.get_event_loop().run_in_executor(None, service.join)
+        await asyncio.sleep(0.01)
+    asyncio.run(main())
+
+
+def test_release(pending):
+    service = Service(hang=True)
+
+    async def main():
+        completion = aio.Completion()
+        service.request_(1, completion.block)
+        asyncio.get_event_loop().call_later(0.05, completion.release)
+        with pytest.raises(asyncio.CancelledError):
+            await completion
+    asyncio.run(main())
+    assert not pending
+
+
+def test_gather_limits_calls_in_flight(pending):
+    service = Service(delay=0.02)
+
+    async def main():
+        return await aio.gather(*[aio.call(service.request_, i) for i in range(10)], limit=3)
+    assert asyncio.run(main()) == [i * 2 for i in range(10)]
+    assert service.most_in_flight == 3
+    assert not pending
+
+
+def test_gather_without_a_limit():
+    service = Service(delay=0.02)
+
+    async def main():
+        return await aio.gather(*[aio.call(service.request_, i) for i in range(10)])
+    assert asyncio.run(main()) == [i * 2 for i in range(10)]
+    assert service.most_in_flight == 10
+
+
+def test_gather_return_exceptions():
+    service = Service()
+
+    def method(block):
+        raise ValueError('no')
+
+    async def main():
+        return await aio.gather(aio.call(service.request_, 1), aio.call(method), limit=1, return_exceptions=True)
+    result, error = asyncio.run(main())
+    assert result == 2 and isinstance(error, ValueError)
@@ -0,0 +1,279 @@
+import importlib
+import pickle
+from io import BytesIO
+import sys
+from PIL import Image
+import objc_util
+import objc_tools
+from objc_tools import apps
+import appfakes
+from nsfakes import String, Bool, Dictionary
+
+
+def test_import_does_not_enumerate_apps(monkeypatch):
+    workspace = appfakes.Workspace(3)
+
+    class LSApplicationWorkspace (object):
+        @staticmethod
+        def defaultWorkspace():
+            return workspace
+
+    stub = objc_util.ObjCClass
+    monkeypatch.setattr(objc_util, 'ObjCClass', lambda name: LSApplicationWorkspace if name == 'LSApplicationWorkspace' else stub(name))
+    monkeypatch.setattr(objc_tools, 'apps', apps)
+    monkeypatch.delitem(sys.modules, 'objc_tools.apps')
+    fresh = importlib.import_module('objc_tools.apps')
+    assert fresh.workspace is workspace
+    assert workspace.enumerations == 0
+    assert len(fresh.inventory) == 3
+    assert workspace.enumerations == 1
+
+
+def test_inventory_enumerates_once():
+    workspace = appfakes.Workspace(10)
+    inventory = apps.AppInventory(workspace)
+    assert workspace.enumerations == 0
+    assert len(inventory) == 10
+    inventory.get('com.app1')
+    inventory.appsWithVendor('V1')
+    assert workspace.enumerations == 1
+    inventory.invalidate()
+    assert 'com.app1' in inventory
+    assert workspace.enumerations == 2
+
+
+def test_inventory_indexes():
+    inventory = apps.AppInventory(appfakes.Workspace(10))
+    assert inventory.get('com.app3').name == 'App 3'
+    assert inventory.get('com.missing') is None
+    assert inventory.vendors == ['V0', 'V1', 'V2']
+    assert [app.appID for app in inventory.appsWithVendor('V1')] == ['com.app1', 'com.app4', 'com.app7']
+    assert inventory.teamIDs == ['T0', 'T1', 'T2', 'T3']
+    assert [app.appID for app in inventory.appsWithTeamID('T2')] == ['com.app2', 'com.app6']
+    assert len(inventory.appsOfType(apps.AppType.User)) == 5
+    assert inventory.appsOfType('System') == inventory.appsOfType(apps.AppType.System)
+
+
+def test_invalidate_during_refresh():
+    # The workspace observer can invalidate on another thread right after refresh()
+    inventory = apps.AppInventory(appfakes.Workspace(3))
+    refresh = inventory.refresh
+
+    def racing():
+        built = refresh()
+        inventory.invalidate()
+        return built
+    inventory.refresh = racing
+    assert len(inventory.apps) == 3
+
+
+def test_watch_invalidates_on_install(monkeypatch):
+    workspace = appfakes.Workspace(3)
+    inventory = apps.AppInventory(workspace)
+    monkeypatch.setattr(apps, '_observer', 'observer')
+    inventory.watch()
+    assert workspace.observers == ['observer']
+    assert len(inventory) == 3
+    workspace.proxies.append(appfakes.Proxy(3))
+    apps._applicationsChanged()
+    assert len(inventory) == 4
+    inventory.unwatch()
+    assert workspace.observers == []
+
+
+def test_properties_cost_one_bridge_call():
+    app = apps.App(appfakes.Proxy(1))
+    appfakes.Proxy.calls = 0
+    assert app.name == 'App 1'
+    assert app.name == 'App 1'
+    assert appfakes.Proxy.calls == 1
+    assert app.backgroundModes == [] and app.backgroundModes == []
+    assert appfakes.Proxy.calls == 2
+
+
+def test_prefetch_loads_only_the_named_fields():
+    proxies = [appfakes.Proxy(i) for i in range(20)]
+    loaded = apps.prefetch([apps.App(proxy) for proxy in proxies], ['name', 'vendor'], workers=2)
+    appfakes.Proxy.calls = 0
+    assert [app.name for app in loaded] == ['App {}'.format(i) for i in range(20)]
+    assert [app.vendor for app in loaded][:3] == ['V0', 'V1', 'V2']
+    assert appfakes.Proxy.calls == 0
+    loaded[0].version
+    assert appfakes.Proxy.calls == 1
+
+
+def test_prefetch_costs_one_call_per_field():
+    appfakes.Proxy.calls = 0
+    apps.prefetch([apps.App(appfakes.Proxy(i)) for i in range(20)], ['name', 'vendor', 'teamID'])
+    # One applicationIdentifier call per app to build it, then one per field
+    assert appfakes.Proxy.calls == 20 * 4
+
+
+def _inventory(tmp_path, count):
+    return apps.AppInventory(appfakes.Workspace(count), schemesPath=str(tmp_path / 'schemes.json'))
+
+
+def test_scheme_index(tmp_path):
+    inventory = _inventory(tmp_path, 4)
+    inventory.workspace.unopened = ['nobody']
+    index = inventory.schemeIndex
+    assert index.path == str(tmp_path / 'schemes.json')
+    assert index.appForScheme('S1').appID == 'com.app1'
+    assert index.appForScheme('x1').appID == 'com.app1'
+    assert index.appForScheme('nobody') is None
+    assert 'nobody' in index.publicSchemes
+    assert index.schemesForApp('com.app2') == ['s2', 'x0']
+    assert [app.appID for app in inventory.appsWithScheme('x1')] == ['com.app1', 'com.app3']
+
+
+def test_scheme_index_is_reused_until_apps_change(tmp_path):
+    inventory = _inventory(tmp_path, 4)
+    inventory.schemeIndex.load()
+    appfakes.Proxy.calls = 0
+    reloaded = apps.SchemeIndex(inventory, inventory.schemesPath)
+    reloaded.load()
+    assert reloaded.appForScheme('s3').appID == 'com.app3'
+    # The saved index is reused without resolving any scheme again
+    assert appfakes.Proxy.calls == 0
+    inventory.workspace.proxies.append(appfakes.Proxy(9))
+    inventory.invalidate()
+    assert inventory.schemeIndex.appForScheme('s9').appID == 'com.app9'
+
+
+def test_scheme_index_rebuilds_a_damaged_file(tmp_path):
+    inventory = _inventory(tmp_path, 2)
+    with open(inventory.schemesPath, 'w') as f:
+        f.write('{"fingerp')
+    assert inventory.schemeIndex.appForScheme('s1').appID == 'com.app1'
+    assert [name for name in tmp_path.iterdir() if name.suffix == '.tmp'] == []
+
+
+def _renderer(rendered):
+    def render(bid, scale, form):
+        rendered.append(bid)
+        buffer = BytesIO()
+        Image.new('RGB', (int(30 * scale), int(30 * scale)), (0, 0, 255)).save(buffer, 'PNG')
+        return buffer.getvalue()
+    return render
+
+
+def test_export_icons_renders_once(tmp_path):
+    icons = [apps.App(appfakes.Proxy(i)) for i in range(6)]
+    rendered = []
+    cold = apps.export_icons(icons, directory=str(tmp_path), renderer=_renderer(rendered))
+    assert (cold.rendered, cold.cached) == (6, 0)
+    assert cold.icons['com.app2'].size == (60, 60)
+    warm = apps.export_icons(icons, directory=str(tmp_path), renderer=_renderer(rendered))
+    assert (warm.rendered, warm.cached) == (0, 6)
+    assert warm.icons['com.app2'].getpixel((0, 0)) == (0, 0, 255)
+    assert len(rendered) == 6
+
+
+def test_export_icons_renders_again_after_an_update(tmp_path):
+    rendered = []
+    apps.export_icons([apps.App(appfakes.Proxy(1))], directory=str(tmp_path), renderer=_renderer(rendered))
+    updated = apps.App(appfakes.Proxy(1, bundleVersion='2.0'))
+    export = apps.export_icons([updated], directory=str(tmp_path), renderer=_renderer(rendered))
+    assert export.rendered == 1
+    apps.export_icons([updated], scale=3.0, directory=str(tmp_path), renderer=_renderer(rendered))
+    assert rendered == ['com.app1'] * 3
+
+
+def _usage(proxy, static, dynamic):
+    proxy.values.update(staticDiskUsage=appfakes.Number(static), dynamicDiskUsage=appfakes.Number(dynamic))
+
+
+def test_disk_report(tmp_path, monkeypatch):
+    path = str(tmp_path / 'usage.json')
+    inventory = apps.AppInventory(appfakes.Workspace(4))
+    monkeypatch.setattr(apps, 'inventory', inventory)
+    first = apps.disk_report(path=path)
+    assert first.bundleIDs == ['com.app3', 'com.app2', 'com.app1', 'com.app0']
+    assert list(first.total) == [3030, 2020, 1010, 0]
+    # Nothing to compare the first report to
+    assert list(first.growth) == [0, 0, 0, 0] and first.topGrowers() == [] and first.new == []
+
+    proxies = inventory.workspace.proxies
+    _usage(proxies[1], 5000, 10)
+    proxies.append(appfakes.Proxy(4))
+    del proxies[0]
+    inventory.invalidate()
+    second = apps.disk_report(path=path)
+    assert second.topGrowers(2) == [('com.app4', 4040), ('com.app1', 4000)]
+    assert second.new == ['com.app4']
+    assert second.removed == ['com.app0']
+
+
+def test_disk_report_on_some_apps_keeps_the_others(tmp_path, monkeypatch):
+    path = str(tmp_path / 'usage.json')
+    inventory = apps.AppInventory(appfakes.Workspace(4))
+    monkeypatch.setattr(apps, 'inventory', inventory)
+    apps.disk_report(path=path)
+    _usage(inventory.workspace.proxies[2], 3000, 20)
+    partial = apps.disk_report([inventory.get('com.app2')], path=path)
+    assert partial.topGrowers() == [('com.app2', 1000)]
+    assert partial.new == [] and partial.removed == []
+    full = apps.disk_report(path=path)
+    assert full.new == [] and full.topGrowers() == []
+
+
+def test_disk_report_survives_a_damaged_file(tmp_path, monkeypatch):
+    path = tmp_path / 'usage.json'
+    path.write_text('{"timestamp": 1, "ap')
+    monkeypatch.setattr(apps, 'inventory', apps.AppInventory(appfakes.Workspace(2)))
+    assert len(apps.disk_report(path=str(path))) == 2
+    assert apps.disk_report(path=str(path)).new == []
+
+
+def _audited(tmp_path, monkeypatch, count):
+    inventory = apps.AppInventory(appfakes.Workspace(count))
+    monkeypatch.setattr(apps, 'inventory', inventory)
+    for i, proxy in enumerate(inventory.workspace.proxies):
+        key = 'UIFileSharingEnabled' if i % 3 == 0 else 'LSRequiresIPhoneOS'
+        plist = Dictionary({String('CFBundleName'): String('App {}'.format(i)), String(key): Bool(True)})
+        proxy.values['_infoDictionary'] = appfakes.InfoDictionary(plist)
+    return inventory, str(tmp_path / 'audit.pickle')
+
+
+def test_audit(tmp_path, monkeypatch):
+    inventory, path = _audited(tmp_path, monkeypatch, 6)
+    audit = apps.audit(path=path)
+    assert len(audit) == 6
+    assert audit.results['com.app3']['infoPlist'] == {'CFBundleName': 'App 3', 'UIFileSharingEnabled': True}
+    assert audit.appsWithEntitlement('aps-environment') == ['com.app1', 'com.app3', 'com.app5']
+    assert audit.appsWithEntitlement('aps-environment', 'development') == []
+    assert audit.appsWithInfoKey('UIFileSharingEnabled') == ['com.app0', 'com.app3']
+    assert audit.appsWithBackgroundMode('audio') == ['com.app0', 'com.app5']
+
+
+def test_audit_only_converts_new_versions(tmp_path, monkeypatch):
+    inventory, path = _audited(tmp_path, monkeypatch, 4)
+    apps.audit(path=path)
+    inventory.workspace.proxies[1].values['bundleVersion'] = '2.0'
+    inventory.invalidate()
+    inventory.apps
+    appfakes.Proxy.calls = 0
+    apps.audit(fields=['entitlements'], path=path)
+    # Four versions for the cache keys and the updated app's entitlements
+    assert appfakes.Proxy.calls == 5
+    with open(path, 'rb') as f:
+        assert sorted(pickle.load(f)) == [('com.app0', '1.0'), ('com.app1', '2.0'), ('com.app2', '1.2'), ('com.app3', '1.3')]
+
+
+def test_audit_drops_uninstalled_apps(tmp_path, monkeypatch):
+    inventory, path = _audited(tmp_path, monkeypatch, 4)
+    apps.audit(path=path)
+    # Auditing some apps keeps the rest
+    apps.audit([inventory.get('com.app1')], path=path)
+    del inventory.workspace.proxies[3]
+    inventory.invalidate()
+    apps.audit(path=path)
+    with open(path, 'rb') as f:
+        assert sorted(bid for bid, version in pickle.load(f)) == ['com.app0', 'com.app1', 'com.app2']
+
+
+def test_audit_survives_a_damaged_cache(tmp_path, monkeypatch):
+    inventory, path = _audited(tmp_path, monkeypatch, 2)
+    with open(path, 'wb') as f:
+        f.write(pickle.dumps({('com.app0', '1.0'): {}})[:10])
+    assert len(apps.audit(path=path)) == 2
@@ -0,0 +1,71 @@
+import random
+import threading
+import time
+import pytest
+from objc_tools import blocks
+
+
+def test_calls_before_and_after_waiting():
+    b = blocks.Block()
+    b.block('early')
+    assert b.wait(1) == ['early']
+    threading.Timer(0.05, b.block, ['late']).start()
+    assert b.wait(1) == ['late']
+
+
+def test_check_for_objects_without_blocking():
+    b = blocks.Block()
+    assert b.check_for_objects(False) is None
+    b.block(1, 2)
+    assert b.check_for_objects(False) == [1, 2]
+    assert b.check_for_objects(False) is None
+
+
+def test_timeout_gives_up_the_slot():
+    b = blocks.Block()
+    with pytest.raises(blocks.TimeoutError):
+        b.wait(0.01)
+    b.block('next')
+    assert b.wait(1) == ['next']
+
+
+def test_blocks_keep_their_own_results():
+    a, b = blocks.Block(), blocks.Block()
+    a.block('a')
+    assert b.check_for_objects(False) is None
+    assert a.wait(1) == ['a']
+
+
+def test_thousands_of_callbacks():
+    # Callbacks come in on their own threads while several waiters drain them
+    b = blocks.Block()
+    calls, waiters = 3000, 10
+    got = []
+    lock = threading.Lock()
+
+    def fire(i):
+        time.sleep(random.random() * 0.05)
+        b.block(i)
+
+    def waiter():
+        for _ in range(calls // waiters):
+            value, = b.wait(10)
+            with lock:
+                got.append(value)
+
+    threads = [threading.Thread(target=waiter) for _ in range(waiters)]
+    threads += [threading.Thread(target=fire, args=(i,)) for i in range(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(got) == list(range(calls))
+
+
+def test_waiting_uses_no_cpu():
+    # A busy-wait would spend the whole timeout on the CPU
+    b = blocks.Block()
+    start = time.process_time()
+    with pytest.raises(blocks.TimeoutError):
+        b.wait(0.5)
+    assert time.process_time() - start < 0.1
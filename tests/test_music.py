@@ -0,0 +1,668 @@
+import asyncio
+from io import BytesIO
+import re
+import threading
+import time
+import tracemalloc
+import numpy as np
+import pytest
+from PIL import Image
+import fakes
+from objc_tools import music
+
+
+def test_song_fields_are_fetched_once_when_read():
+    song = music.Song(fakes.Item(3))
+    fakes.Item.calls = 0
+    assert song.artist == 'A3'
+    assert song.artist == 'A3'
+    assert fakes.Item.calls == 1
+    assert song.bpm is None and song.lyrics is None
+
+
+def test_song_prefetch():
+    song = music.Song(fakes.Item(3))
+    fakes.Item.calls = 0
+    song.prefetch(['year', 'album'])
+    assert fakes.Item.calls == 2
+    song.prefetch(['year', 'album'])
+    assert fakes.Item.calls == 2
+    with pytest.raises(ValueError):
+        song.prefetch(['nope'])
+
+
+def test_song_has_no_dict():
+    song = music.Song(fakes.Item(3))
+    with pytest.raises(AttributeError):
+        song.nope = 1
+
+
+def test_song_from_values():
+    song = music.Song.from_values({'title': 'x'}, fakes.Item(3))
+    assert song.title == 'x'
+    assert song.artist == 'A3'
+    with pytest.raises(ValueError):
+        music.Song.from_values({'title': 'x'})
+
+
+def _cache(tmp_path, items, library):
+    return music.LibraryCache(str(tmp_path / 'cache.sqlite'), library, lambda: fakes.Query(items))
+
+
+def test_library_cache_warm_load_skips_the_bridge(tmp_path):
+    items = fakes.library(50)
+    cache = _cache(tmp_path, items, fakes.Library())
+    cold = cache.load()
+    fakes.Item.calls = 0
+    warm = cache.load()
+    assert fakes.Item.calls == 0
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+    assert [song.title for song in warm] == [song.title for song in cold]
+    assert warm[0].cloud is False
+
+
+def test_library_cache_keeps_unsigned_ids(tmp_path):
+    items = [fakes.Item(2 ** 64 - 5, albumPersistentID=2 ** 64 - 9)]
+    cache = _cache(tmp_path, items, fakes.Library())
+    cache.load()
+    song, = cache.load()
+    assert song.persistentID == 2 ** 64 - 5
+    assert song.albumPersistentID == 2 ** 64 - 9
+
+
+def test_library_cache_rebuilds_when_the_library_changes(tmp_path):
+    items = fakes.library(5)
+    library = fakes.Library()
+    cache = _cache(tmp_path, items, library)
+    cache.load()
+    items.append(fakes.Item(5))
+    library.modified = 2.0
+    assert len(cache.load()) == 6
+    assert cache.misses == 2
+
+
+class _PredicateQuery (fakes.Query):
+    '''Applies (value, property, comparison) predicates like MPMediaQuery'''
+    def __init__(self, items):
+        fakes.Query.__init__(self, items)
+        self.predicates = []
+
+    def addFilterPredicate_(self, predicate):
+        self.predicates.append(predicate)
+
+    def items(self):
+        def matches(item, value, prop, comparison):
+            if comparison:
+                return value.lower() in item.values[prop].lower()
+            return item.values[prop] == value
+        return [item for item in self._items if all(matches(item, *p) for p in self.predicates)]
+
+
+class _Predicate (object):
+    @staticmethod
+    def predicateWithValue_forProperty_comparisonType_(value, prop, comparison):
+        return (value, prop, comparison)
+
+
+@pytest.fixture
+def filterable(monkeypatch):
+    monkeypatch.setattr(music, 'canFilter', lambda key: key in ('title', 'artist', 'albumTitle', 'genre'))
+    monkeypatch.setattr(music, 'MPMediaPropertyPredicate', _Predicate)
+
+
+def test_filter_splits_native_and_local_terms(filterable):
+    f = music.Filter('a3', 'artist').where(music.Between('playCount', 9) | music.Matches('title', r'T1\d$'))
+    f.where(~music.Equals('genre', 'G0'))
+    native, local = f.plan()
+    assert [term.property for term in native] == ['artist']
+    assert len(local.terms) == 2
+    assert 'native' in f.explain() and 'local' in f.explain()
+
+
+def test_filter_matches_like_a_local_scan(filterable):
+    items = fakes.library(300)
+    f = music.Filter('a3', 'artist').where(music.Between('playCount', 9) | music.Matches('title', r'T1\d$'))
+    f.where(~music.Equals('genre', 'G0'))
+    found = [song.persistentID for song in f.iter_matches(lambda: _PredicateQuery(items))]
+    expected = [item.values['persistentID'] for item in items
+                if item.values['artist'] == 'A3' and item.values['genre'] != 'G0'
+                and (item.values['playCount'] >= 9 or re.search(r'T1\d$', item.values['title']))]
+    assert found and found == expected
+
+
+def test_terms_need_matches():
+    with pytest.raises(TypeError):
+        music.Term('title')
+
+
+def test_iter_library_chunks():
+    items = fakes.library(10)
+    chunks = list(music.iter_library(4, lambda: fakes.Query(items)))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert [song.persistentID for chunk in chunks for song in chunk] == list(range(10))
+
+
+def test_iter_library_builds_songs_as_they_are_used():
+    items = fakes.library(10)
+    fakes.Item.calls = 0
+    songs = music.iter_library(query=lambda: fakes.Query(items))
+    assert fakes.Item.calls == 0
+    next(songs)
+    # Only the first song's title has been read
+    assert fakes.Item.calls == 1
+
+
+def test_benchmark_iter_library():
+    items = fakes.library(50000)
+    query = lambda: fakes.Query(items)
+
+    # The old library() built every Song before returning the first
+    tracemalloc.start()
+    start = time.perf_counter()
+    returns = []
+    for item in query().items():
+        returns += [music.Song(item)]
+    first = returns[0]
+    eager_first = time.perf_counter() - start
+    eager_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del returns, first
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    songs = music.iter_library(query=query)
+    first = next(songs)
+    lazy_first = time.perf_counter() - start
+    count = 1 + sum(1 for song in songs)
+    lazy_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print('\nlibrary of 50k songs: list first item {:.1f} ms {:.0f} KB peak, '
+          'iter_library first item {:.3f} ms {:.0f} KB peak'.format(
+              eager_first * 1e3, eager_peak / 1e3, lazy_first * 1e3, lazy_peak / 1e3))
+    assert count == 50000 and first.persistentID == 0
+    assert lazy_first * 10 < eager_first
+    # Only the query's item list is held, not a Song per item
+    assert lazy_peak * 2 < eager_peak
+
+
+def _snapshot():
+    items = [fakes.Item(1, title='b', artist='Y', playCount=3, playbackDuration=200.0),
+             fakes.Item(2, title='a', artist='X', playCount=1, playbackDuration=100.0),
+             fakes.Item(3, title='c', artist='Y', playCount=5, playbackDuration=300.0),
+             fakes.Item(4, title='B', artist='Z', playCount=0, playbackDuration=150.0)]
+    return music.LibrarySnapshot.from_items(items)
+
+
+def test_snapshot_columns():
+    snap = _snapshot()
+    assert len(snap) == 4
+    assert list(snap['artist']) == ['Y', 'X', 'Y', 'Z']
+    assert snap.labels('artist') == ['Y', 'X', 'Z']
+    assert snap.codes('artist').tolist() == [0, 1, 0, 2]
+    assert snap['playCount'].tolist() == [3, 1, 5, 0]
+
+
+def test_snapshot_where_and_select():
+    snap = _snapshot()
+    assert snap.where('artist', 'Y').tolist() == [True, False, True, False]
+    assert not snap.where('artist', 'nobody').any()
+    assert snap.where('playCount', 1).tolist() == [False, True, False, False]
+    ys = snap.select(snap.where('artist', 'Y'))
+    assert ys['persistentID'].tolist() == [1, 3]
+    assert [song.title for song in ys.songs()] == ['b', 'c']
+    assert snap.select(np.array([3, 0]))['title'].tolist() == ['B', 'b']
+    assert len(snap.select(snap['playCount'] > 10)) == 0
+
+
+def test_snapshot_sort():
+    snap = _snapshot()
+    assert snap.sort('title')['title'].tolist() == ['B', 'a', 'b', 'c']
+    assert snap.sort('artist')['persistentID'].tolist() == [2, 1, 3, 4]
+    assert snap.sort('duration', reverse=True)['persistentID'].tolist() == [3, 1, 4, 2]
+    assert [song.persistentID for song in snap.sort('playCount').songs()] == [4, 2, 1, 3]
+
+
+def test_snapshot_group_by():
+    snap = _snapshot()
+    assert snap.group_by('artist') == {'Y': 2, 'X': 1, 'Z': 1}
+    plays = snap.group_by('artist', 'playCount')
+    assert plays == {'Y': 8, 'X': 1, 'Z': 0}
+    assert all(type(total) is int for total in plays.values())
+    assert snap.group_by('artist', snap['duration'] * snap['playCount']) == {'Y': 2100.0, 'X': 100.0, 'Z': 0.0}
+    # Labels with no rows left after a select are left out
+    assert snap.select(snap.where('artist', 'Y')).group_by('artist') == {'Y': 2}
+
+
+def test_empty_snapshot(tmp_path):
+    snap = music.LibrarySnapshot.from_items([])
+    assert len(snap) == 0
+    assert snap.group_by('artist') == {}
+    assert len(snap.sort('title')) == 0
+    assert not snap.where('artist', 'Y').any()
+    assert list(snap.songs()) == []
+    path = str(tmp_path / 'empty.npz')
+    snap.save(path)
+    loaded, meta = music.LibrarySnapshot.load(path)
+    assert len(loaded) == 0 and meta == {}
+
+
+def test_snapshot_save_and_load(tmp_path, library_items):
+    snap = music.LibrarySnapshot.from_items(library_items)
+    path = str(tmp_path / 'snap.npz')
+    snap.save(path, modified=1.0)
+    loaded, meta = music.LibrarySnapshot.load(path)
+    assert meta == {'modified': 1.0}
+    assert set(loaded.columns) == set(snap.columns)
+    for name in snap.columns:
+        assert loaded[name].tolist() == snap[name].tolist()
+        assert loaded[name].dtype == snap[name].dtype
+    assert loaded['persistentID'][-1] == 2 ** 64 - 5
+    assert loaded.group_by('artist', 'playCount') == snap.group_by('artist', 'playCount')
+    # Loaded snapshots have no items, their songs look them up by persistentID
+    assert [song.artist for song in loaded.songs()] == [song.artist for song in snap.songs()]
+
+
+def _watcher(count=5):
+    items = fakes.library(count)
+    library = fakes.Library()
+    watcher = music.LibraryWatcher(lambda: fakes.Query(items), library)
+    watcher.prime()
+    return watcher, items, library
+
+
+def _changes(events):
+    return sorted((event.change, event.persistentID) for event in events)
+
+
+def test_watcher_prime_reports_nothing():
+    watcher, items, library = _watcher()
+    assert len(watcher) == 5
+    assert list(watcher.refresh(force=True)) == []
+
+
+def test_watcher_reports_changes():
+    watcher, items, library = _watcher()
+    items[1].values['playCount'] += 1
+    items[2].values['rating'] = 5
+    del items[3]
+    items.append(fakes.Item(7))
+    library.modified = 2.0
+    events = list(watcher.refresh())
+    assert _changes(events) == [(music.LibraryChange.Added, 7), (music.LibraryChange.Removed, 3),
+                                (music.LibraryChange.Modified, 1), (music.LibraryChange.Modified, 2)]
+    songs = {event.persistentID: event.song for event in events}
+    assert songs[3] is None
+    assert songs[7].title == 'T7' and songs[1].playCount == 2
+    assert len(watcher) == 5
+    library.modified = 3.0
+    assert list(watcher.refresh()) == []
+
+
+def test_watcher_skips_the_scan_while_the_library_is_unchanged():
+    watcher, items, library = _watcher()
+    items.append(fakes.Item(7))
+    fakes.Item.calls = 0
+    assert list(watcher.refresh()) == []
+    assert fakes.Item.calls == 0
+    assert _changes(watcher.refresh(force=True)) == [(music.LibraryChange.Added, 7)]
+
+
+def test_watcher_reports_again_after_stopping_early():
+    watcher, items, library = _watcher()
+    items.append(fakes.Item(7))
+    items[0].values['playCount'] += 1
+    library.modified = 2.0
+    events = watcher.refresh()
+    first = next(events)
+    events.close()
+    assert len(watcher) == 5
+    again = list(watcher.refresh())
+    assert (first.change, first.persistentID) in _changes(again)
+    assert _changes(again) == [(music.LibraryChange.Added, 7), (music.LibraryChange.Modified, 0)]
+    assert list(watcher.refresh()) == []
+
+
+def _songs(*specs):
+    return [music.Song(fakes.Item(pid, title=title, artist=artist, playbackDuration=duration))
+            for pid, (title, artist, duration) in enumerate(specs, 1)]
+
+
+def _ids(groups):
+    return sorted(sorted(song.persistentID for song in group) for group in groups)
+
+
+def test_find_duplicates():
+    songs = _songs(('Hey Jude', 'The Beatles', 431.0),
+                   ('Hey Jude!', 'the beatles', 432.5),
+                   ('Hey Jude (Remastered 2015)', 'The Beatles', 430.0),
+                   ('Hey Jude', 'The Beatles', 300.0),
+                   ('Café (feat. X)', 'Björk feat. Y', 200.0),
+                   ('Cafe', 'Bjork', 201.0))
+    assert _ids(music.find_duplicates(songs)) == [[1, 2], [5, 6]]
+    assert _ids(music.find_duplicates(songs, tolerance_seconds=5, fuzzy=True)) == [[1, 2, 3], [5, 6]]
+
+
+def test_find_duplicates_scales_to_large_libraries():
+    songs = [music.Song(fakes.Item(pid, title='t{}'.format(pid % 5000), artist='A', playbackDuration=100.0 + pid % 3))
+             for pid in range(20000)]
+    groups = music.find_duplicates(songs)
+    assert sum(len(group) for group in groups) == 20000
+    for group in groups:
+        assert len({song.title for song in group}) == 1
+        assert max(song.duration for song in group) - min(song.duration for song in group) <= 2
+
+
+def _naive_duplicates(songs, tolerance_seconds=2):
+    """Compares every pair of songs, the O(n^2) scan find_duplicates replaces"""
+    keys = [(music._normalize(song.title), music._normalize(song.artist, artist=True)) for song in songs]
+    durations = [song.duration for song in songs]
+    group_of = {}
+    for i in range(len(songs)):
+        for j in range(i + 1, len(songs)):
+            if keys[i] == keys[j] and abs(durations[i] - durations[j]) <= tolerance_seconds:
+                group = group_of.setdefault(i, {i})
+                group.add(j)
+                group_of[j] = group
+    return {frozenset(songs[i].persistentID for i in group) for group in group_of.values()}
+
+
+def test_benchmark_find_duplicates():
+    # 20k distinct songs, most of them there two or three times with a
+    # different spelling and a duration a second or two off
+    spellings = ['Song {} (feat. Someone)', 'SONG {}!', 'song {}']
+    songs = [music.Song(fakes.Item(pid, title=spellings[pid // 20000].format(pid % 20000),
+                                   artist='Artist {}'.format(pid % 500),
+                                   playbackDuration=100.0 + pid % 20000 % 7 * 20 + pid // 20000 * 0.7))
+             for pid in range(50000)]
+
+    start = time.perf_counter()
+    groups = music.find_duplicates(songs)
+    fast_time = time.perf_counter() - start
+
+    # The naive scan is timed on a sample and scaled up, 50k songs would take minutes
+    sample = [song for song in songs if song.persistentID % 20000 < 800]
+    start = time.perf_counter()
+    naive = _naive_duplicates(sample)
+    naive_time = (time.perf_counter() - start) * (len(songs) / len(sample)) ** 2
+
+    print('\nduplicates in 50k songs: find_duplicates {:.2f}s, naive O(n^2) about {:.0f}s'.format(fast_time, naive_time))
+    assert len(groups) == 20000 and sum(len(group) for group in groups) == 50000
+    sampled = {song.persistentID for song in sample}
+    assert {frozenset(song.persistentID for song in group) for group in groups
+            if group[0].persistentID in sampled} == naive
+    assert fast_time * 20 < naive_time
+
+
+class _IDQuery (fakes.Query):
+    '''A songsQuery filtered by a persistentID predicate'''
+    def addFilterPredicate_(self, predicate):
+        value, prop = predicate
+        self._items = [item for item in self._items if item.values[prop] == value.value]
+
+
+class _IDPredicate (object):
+    @staticmethod
+    def predicateWithValue_forProperty_(value, prop):
+        return (value, prop)
+
+
+class _NSNumber (object):
+    def __init__(self, value):
+        self.value = value
+
+    @staticmethod
+    def numberWithUnsignedLongLong_(value):
+        return _NSNumber(value)
+
+
+@pytest.fixture
+def library_items(monkeypatch):
+    items = fakes.library(5) + [fakes.Item(2 ** 64 - 5)]
+
+    class MPMediaQuery (object):
+        @staticmethod
+        def songsQuery():
+            return _IDQuery(items)
+    monkeypatch.setattr(music, 'MPMediaQuery', MPMediaQuery)
+    monkeypatch.setattr(music, 'MPMediaPropertyPredicate', _IDPredicate)
+    monkeypatch.setattr(music, 'NSNumber', _NSNumber)
+    return items
+
+
+def test_songs_look_up_their_item(library_items):
+    assert music.Song.from_values({'persistentID': 3}).artist == 'A3'
+    assert music.Song.from_values({'persistentID': 2 ** 64 - 5}).title == 'T18446744073709551611'
+
+
+def test_songs_missing_from_the_library(library_items):
+    song = music.Song.from_values({'persistentID': 99, 'title': 'gone'})
+    assert song.title == 'gone'
+    with pytest.raises(LookupError):
+        song.artist
+    with pytest.raises(LookupError):
+        song.artwork()
+
+
+def test_song_at_index_wraps_around():
+    player = music.NowPlayingController(fakes.Player(fakes.library(5), index=4))
+    assert player.song_at_index(7).persistentID == 2
+    assert player.next_song_info.persistentID == 0
+
+
+def test_empty_queue():
+    player = music.NowPlayingController(fakes.Player([]))
+    assert player.song_at_index(0) is None
+    assert player.next_song_info is None
+    assert player.queue_snapshot() == []
+    assert player.queue_snapshot(window=2) == []
+
+
+def test_queue_snapshot_window():
+    player = music.NowPlayingController(fakes.Player(fakes.library(10), index=1))
+    assert [item.index for item in player.queue_snapshot(window=2)] == [0, 1, 2, 3]
+    player._objc.index = 9
+    assert [item.index for item in player.queue_snapshot(window=2)] == [7, 8, 9]
+    assert [item.song.persistentID for item in player.queue_snapshot()] == list(range(10))
+
+
+def test_queue_snapshot_is_reused_until_the_queue_moves():
+    fake = fakes.Player(fakes.library(10), index=3)
+    player = music.NowPlayingController(fake)
+    first = player.queue_snapshot(window=1)
+    fakes.Player.calls = 0
+    assert player.queue_snapshot(window=1) is first
+    # Only the count and index were checked
+    assert fakes.Player.calls == 2
+    fake.index = 4
+    moved = player.queue_snapshot(window=1)
+    assert [item.index for item in moved] == [3, 4, 5]
+    fake.items.append(fakes.Item(10))
+    assert player.queue_snapshot(window=1) is not moved
+
+
+_now_playing = 'MPMusicPlayerControllerNowPlayingItemDidChangeNotification'
+_state = 'MPMusicPlayerControllerPlaybackStateDidChangeNotification'
+
+
+def _subscribed_player(debounce=0):
+    center = fakes.NotificationCenter()
+    player = music.NowPlayingController(fakes.Player(fakes.library(5), index=2), debounce, center)
+    return player, center
+
+
+def test_notifications_are_coalesced():
+    player, center = _subscribed_player(debounce=0.05)
+    events = []
+    player.subscribe(events.append)
+    assert player._objc.generating
+    for _ in range(5):
+        center.post(_now_playing)
+        center.post(_state)
+    time.sleep(0.2)
+    event, = events
+    assert event.changes == {'nowPlaying', 'state'}
+    assert event.song.title == 'T2'
+    assert event.state == music.PlaybackState.Playing
+
+
+def test_events_reach_an_asyncio_queue():
+    player, center = _subscribed_player()
+
+    async def main():
+        queue = asyncio.Queue()
+        player.subscribe(queue=queue)
+        threading.Thread(target=center.post, args=(_state,)).start()
+        return await asyncio.wait_for(queue.get(), 1)
+    assert asyncio.run(main()).changes == {'state'}
+
+
+def test_failing_callbacks_dont_stop_delivery(capsys):
+    player, center = _subscribed_player()
+    events = []
+
+    def failing(event):
+        raise RuntimeError('callback failed')
+    player.subscribe(failing)
+    player.subscribe(events.append)
+    center.post(_state)
+    assert len(events) == 1
+    assert 'callback failed' in capsys.readouterr().err
+
+
+def test_unsubscribing_stops_observing():
+    player, center = _subscribed_player()
+    subscription = player.subscribe(lambda event: None)
+    center.post(_state)
+    player._objc.time = 3.0
+    assert player.interpolated_time >= 10.0
+    player.unsubscribe(subscription)
+    assert center.observers == {}
+    assert not player._objc.generating
+    assert player.interpolated_time == 3.0
+
+
+def test_benchmark_lazy_filter(filterable, monkeypatch):
+    items = fakes.library(20000)
+
+    class MPMediaQuery (object):
+        @staticmethod
+        def songsQuery():
+            return _PredicateQuery(items)
+    monkeypatch.setattr(music, 'MPMediaQuery', MPMediaQuery)
+    f = music.Filter('a3', 'artist').where(music.Between('playCount', 9) | music.Matches('title', r'7$'))
+
+    # Building every matching song with all of its fields, as getMatches used to
+    fakes.Item.calls = 0
+    start = time.perf_counter()
+    native, local = f.plan()
+    query = MPMediaQuery.songsQuery()
+    for term in native:
+        query.addFilterPredicate_(term.predicate())
+    eager = [song for song in (music.Song(item).prefetch() for item in query.items()) if local.matches(song)]
+    eager_time, eager_calls = time.perf_counter() - start, fakes.Item.calls
+
+    fakes.Item.calls = 0
+    start = time.perf_counter()
+    lazy = f.getMatches()
+    lazy_time, lazy_calls = time.perf_counter() - start, fakes.Item.calls
+
+    print('\nfilter 20k songs: eager {:.3f}s {} calls, lazy {:.3f}s {} calls'.format(eager_time, eager_calls, lazy_time, lazy_calls))
+    assert [song.persistentID for song in lazy] == [song.persistentID for song in eager]
+    assert lazy_calls * 5 < eager_calls
+
+
+def _playlist(*results):
+    return music.Playlist(fakes.Playlist(results=results))
+
+
+def _library_songs(count):
+    return [music.Song(item) for item in fakes.library(count)]
+
+
+def test_add_songs_in_chunks():
+    playlist = _playlist()
+    songs = _library_songs(1200)
+    report = playlist.add_songs(songs, chunk_size=500)
+    assert [chunk.count for chunk in report.chunks] == [500, 500, 200]
+    assert all(chunk.completed and chunk.error is None for chunk in report.chunks)
+    assert report.added == 1200 and playlist.itemCount == 1200
+    assert playlist._objc.items == [song._objc for song in songs]
+
+
+def test_add_songs_stops_after_a_timeout():
+    playlist = _playlist('ok', 'hang')
+    report = playlist.add_songs(_library_songs(30), chunk_size=10, timeout=0.1)
+    assert [chunk.completed for chunk in report.chunks] == [True, False]
+    assert len(playlist._objc.added) == 2
+    assert report.added == 10 and playlist.itemCount == 10
+    # The block that never fired is kept alive in case it still does
+    assert len(playlist._blocks) == 1
+
+
+def test_add_songs_reports_errors():
+    playlist = _playlist('ok', fakes.Error('Playlist is full'), 'ok')
+    report = playlist.add_songs(_library_songs(30), chunk_size=10)
+    assert [chunk.error is None for chunk in report.chunks] == [True, False, True]
+    assert report.chunks[1].error.descriptions.description == 'Playlist is full'
+    assert report.added == 20
+
+
+def test_songlist_to_array_reuses_only_with_a_cache():
+    songs = _library_songs(3)
+    assert music.songlist_to_array(songs) is not music.songlist_to_array(songs)
+    cache = {}
+    array = music.songlist_to_array(songs, cache)
+    assert music.songlist_to_array(songs, cache) is array
+    assert music.songlist_to_array(songs[:2], cache) is not array
+
+
+def _png(size=(64, 64), color=(255, 0, 0)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _artwork_cache(**kwargs):
+    # The fake catalogs' images are already PNG bytes
+    return music.ArtworkCache(encoder=lambda image: image, **kwargs)
+
+
+def test_artwork_cache_counts():
+    cache = _artwork_cache()
+    fakes.Catalog.reads = 0
+    catalog = fakes.Catalog(_png())
+    assert Image.open(BytesIO(cache.png('a', lambda: catalog, 16))).size == (16, 16)
+    assert cache.stats['misses'] == 1 and cache.stats['hits'] == 0
+    cache.png('a', lambda: catalog, 16)
+    cache.png('a', lambda: catalog)
+    assert cache.stats['misses'] == 1 and cache.stats['hits'] == 2
+    assert fakes.Catalog.reads == 1
+
+
+def test_artwork_cache_remembers_missing_artwork():
+    cache = _artwork_cache()
+    fakes.Catalog.reads = 0
+    for size in (None, 16, 16):
+        assert cache.png('none', lambda: fakes.Catalog(None), size) is None
+    assert cache.png('no catalog', lambda: None) is None
+    assert fakes.Catalog.reads == 1
+
+
+def test_artwork_cache_evicts_the_least_recently_used():
+    png = _png()
+    cache = _artwork_cache(max_bytes=len(png) * 2)
+    for key in 'abc':
+        cache.png(key, lambda: fakes.Catalog(png))
+    assert cache.stats['evictions'] == 1 and len(cache) == 2
+    assert cache.size <= cache.max_bytes
+
+
+def test_artwork_cache_keeps_thumbnails_on_disk(tmp_path):
+    catalog = fakes.Catalog(_png())
+    _artwork_cache(directory=str(tmp_path)).png(('album', 1), lambda: catalog, 16)
+    assert [path.name for path in tmp_path.iterdir()] == ['album_1_16x16.png']
+    fakes.Catalog.reads = 0
+    cold = _artwork_cache(directory=str(tmp_path))
+    assert Image.open(BytesIO(cold.png(('album', 1), lambda: catalog, 16))).size == (16, 16)
+    assert cold.stats['diskHits'] == 1 and fakes.Catalog.reads == 0
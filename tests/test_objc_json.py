@@ -0,0 +1,235 @@
+import json
+import time
+import tracemalloc
+from io import StringIO
+import pytest
+from datetime import datetime
+from nsfakes import NSObject, String, Number, Bool, Null, Array, Dictionary
+from objc_tools import objc_json
+
+
+class Date (NSObject):
+    kinds = ('NSDate',)
+
+    def timeIntervalSince1970(self):
+        return 0.0
+
+
+class Data (NSObject):
+    kinds = ('NSData',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __bytes__(self):
+        return self.value
+
+
+class Set (Array):
+    kinds = ('NSSet',)
+
+    def allObjects(self):
+        return Array(self.items)
+
+
+class _Sink (object):
+    '''A file that only counts what is written to it'''
+    def __init__(self):
+        self.size = 0
+        self.writes = 0
+
+    def write(self, text):
+        self.size += len(text)
+        self.writes += 1
+
+
+def test_objc_to_native():
+    shared = Dictionary({String('x'): Number(1)})
+    objc = Dictionary({String('a'): Array([Number(1), Number(2.5), Bool(True), Null(), shared, shared]),
+                       String('b'): String('str'),
+                       String('c'): Date()})
+    native = objc_json.objc_to_py(objc)
+    assert native['a'][:4] == [1, 2.5, True, None]
+    assert native['a'][4] == {'x': 1}
+    assert native['b'] == 'str'
+    assert native['c'] == datetime.fromtimestamp(0)
+
+
+def test_shared_objects_are_converted_once():
+    shared = Array([Number(1)])
+    native = objc_json.objc_to_native(Array([shared, shared]))
+    assert native[0] is native[1]
+
+
+def test_deep_nesting_does_not_recurse():
+    root = current = Array([])
+    for _ in range(10000):
+        child = Array([])
+        current.items.append(child)
+        current = child
+    native = objc_json.objc_to_native(root)
+    for _ in range(10000):
+        native, = native
+    assert native == []
+
+
+def test_cycles_raise():
+    cycle = Array([])
+    cycle.items.append(Dictionary({String('k'): cycle}))
+    with pytest.raises(ValueError):
+        objc_json.objc_to_native(cycle)
+
+
+
+class _JSONSerialization (object):
+    """NSJSONSerialization, walking the graph like Foundation does
+    Every object it visits is counted in visits. The text itself comes from
+    json.dumps so the serializing runs at C speed, as it would in Foundation.
+    """
+    visits = 0
+
+    @classmethod
+    def _plain(cls, objc):
+        cls.visits += 1
+        if objc.isKindOfClass_(objc_json.NSDictionary):
+            return {str(key): cls._plain(value) for key, value in objc.items.items()}
+        if objc.isKindOfClass_(objc_json.NSArray):
+            return [cls._plain(item) for item in objc]
+        if objc.isKindOfClass_(objc_json.NSString):
+            return str(objc)
+        if objc.isKindOfClass_(objc_json.NSNull):
+            return None
+        if objc.isKindOfClass_(objc_json.NSNumber):
+            return objc.value
+        raise TypeError(objc)
+
+    @classmethod
+    def isValidJSONObject_(cls, objc):
+        try:
+            cls._plain(objc)
+        except TypeError:
+            return False
+        return True
+
+    @classmethod
+    def dataWithJSONObject_options_error_(cls, objc, options, error):
+        return json.dumps(cls._plain(objc), indent=2 if options else None).encode('utf-8')
+
+
+def _json_path(objc):
+    # objc_to_py before it converted natively
+    if objc_json.checkObject(objc):
+        return json.loads(objc_json.objc_to_str(objc))
+    raise TypeError("Objc object can't be converted")
+
+
+def test_benchmark_objc_to_native(monkeypatch):
+    monkeypatch.setattr(objc_json, 'NSJSONSerialization', _JSONSerialization)
+    scalars = []
+    monkeypatch.setattr(objc_json, '_scalar', lambda objc, scalar=objc_json._scalar: scalars.append(objc) or scalar(objc))
+    # Tracks sharing a few album dictionaries, like a library export
+    albums = [Dictionary({String('field{}'.format(i)): String('album {} value {}'.format(a, i)) for i in range(30)})
+              for a in range(20)]
+    objc = Array([Dictionary({String('title'): String('Song {}'.format(t)), String('plays'): Number(t % 40),
+                              String('rating'): Number(t % 6 / 5.0), String('loved'): Bool(t % 3 == 0),
+                              String('comment'): Null(), String('album'): albums[t % 20]})
+                  for t in range(3000)])
+
+    start = time.perf_counter()
+    json_result = _json_path(objc)
+    json_time = time.perf_counter() - start
+    start = time.perf_counter()
+    native = objc_json.objc_to_native(objc)
+    native_time = time.perf_counter() - start
+
+    print('\n3000 tracks: JSON path {:.3f}s {} objects visited, objc_to_native {:.3f}s {} objects converted'.format(
+        json_time, _JSONSerialization.visits, native_time, len(scalars)))
+    assert native == json_result
+    # The JSON path walks the graph three times and writes every album out for each track
+    assert _JSONSerialization.visits > 3 * 3000 * 36
+    assert len(scalars) < _JSONSerialization.visits / 5
+    assert native[0]['album'] is native[20]['album']
+    # And dates can't go through JSON at all
+    with pytest.raises(TypeError):
+        _json_path(Array([Date()]))
+    assert objc_json.objc_to_native(Array([Date()])) == [datetime.fromtimestamp(0)]
+
+
+def _dumps(objc, **kwargs):
+    fp = StringIO()
+    objc_json.dump(objc, fp, **kwargs)
+    return fp.getvalue()
+
+
+def test_dump_matches_json():
+    objc = Dictionary({String('a'): Array([Number(1), Number(2.5), Bool(False), Null()]),
+                       String('b'): Dictionary({}),
+                       String('c'): Set([String('x')]),
+                       String('d'): Date(),
+                       String('e'): Data(b'\x00\xff')})
+    assert json.loads(_dumps(objc)) == {'a': [1, 2.5, False, None], 'b': {}, 'c': ['x'],
+                                        'd': datetime.fromtimestamp(0).isoformat(), 'e': 'AP8='}
+
+
+def test_dump_escapes_strings_and_keys():
+    text = 'quote " backslash \\ newline \n tab \t nul \x00 unicode \u00e9\u2028\U0001f600'
+    objc = Dictionary({String(text): Array([String(text)]), String('k"\n'): String('')})
+    out = _dumps(objc)
+    assert '\n' not in out.strip()
+    assert json.loads(out) == {text: [text], 'k"\n': ''}
+
+
+def test_dump_lines():
+    objc = Array([Dictionary({String('n'): Number(i), String('s'): String('line\n{}'.format(i))}) for i in range(5)])
+    out = _dumps(objc, lines=True)
+    lines = out.split('\n')
+    assert lines[-1] == ''
+    assert [json.loads(line) for line in lines[:-1]] == [{'n': i, 's': 'line\n{}'.format(i)} for i in range(5)]
+    # Only a top level array is split into lines
+    assert json.loads(_dumps(Dictionary({String('a'): Number(1)}), lines=True)) == {'a': 1}
+
+
+def test_dump_deep_nesting_does_not_recurse():
+    root = current = Array([])
+    for _ in range(10000):
+        child = Array([])
+        current.items.append(child)
+        current = child
+    assert _dumps(root) == '[' * 10001 + ']' * 10001
+
+
+def test_dump_cycles_raise():
+    cycle = Array([])
+    cycle.items.append(cycle)
+    with pytest.raises(ValueError):
+        _dumps(cycle)
+
+
+def _songs(count):
+    return Array([Dictionary({String('id'): Number(i), String('name'): String('Song number {}'.format(i)),
+                              String('tags'): Array([String('a'), String('b')])})
+                  for i in range(count)])
+
+
+def _peak(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_benchmark_dump_memory():
+    small, large = _songs(2000), _songs(20000)
+    sink = _Sink()
+    small_peak = _peak(objc_json.dump, small, _Sink())
+    peak = _peak(objc_json.dump, large, sink)
+    # What dump replaces, the whole document built in memory
+    whole = _peak(lambda objc: json.dumps(objc_json.objc_to_native(objc)), large)
+    print('dump of {:.1f} MB: {:.0f} KB peak ({:.0f} KB for a tenth of it), json.dumps: {:.0f} KB peak'.format(
+        sink.size / 1e6, peak / 1e3, small_peak / 1e3, whole / 1e3))
+    assert sink.size > 1000000 and sink.writes > 15
+    # Memory is bounded by chunk_size, not by the number of elements
+    assert peak < small_peak * 2
+    assert peak < whole / 4
@@ -0,0 +1,80 @@
+from time import perf_counter
+import pytest
+from nsfakes import String, Number, Dictionary, OldDictionary
+from objc_tools import objchandler
+
+
+@pytest.fixture(autouse=True)
+def check_selector(monkeypatch):
+    # Every test checks for getObjects:andKeys:count: again
+    monkeypatch.setattr(objchandler, '_has_count_selector', None)
+
+
+@pytest.mark.parametrize('cls', [Dictionary, OldDictionary])
+def test_dict_items(cls):
+    a, b, one, two = String('a'), String('b'), Number(1), Number(2)
+    keys, values = objchandler.dict_items(cls({a: one, b: two}))
+    assert keys == [a, b]
+    assert values == [one, two]
+    assert objchandler.dict_items(cls({})) == ([], [])
+
+
+def test_objc_dict():
+    one = Number(1)
+    objcd = Dictionary({String('a'): one, String('b'): Dictionary({String('c'): Number(2)})})
+    assert objchandler.objcDict(objcd)['a'] is one
+    assert objchandler.objcDict(objcd, recursive=True) == {'a': 1, 'b': {'c': 2}}
+
+
+class _Elements (object):
+    '''An NSArray whose iteration costs a bridge call per element'''
+    def __init__(self, items):
+        self.items = items
+
+    def __iter__(self):
+        for item in self.items:
+            _CountingDictionary.calls += 1
+            yield item
+
+
+class _CountingDictionary (Dictionary):
+    calls = 0
+
+    def count(self):
+        _CountingDictionary.calls += 1
+        return Dictionary.count(self)
+
+    def respondsToSelector_(self, selector):
+        _CountingDictionary.calls += 1
+        return Dictionary.respondsToSelector_(self, selector)
+
+    def getObjects_andKeys_count_(self, values, keys, count, argtypes=None, restype=None):
+        _CountingDictionary.calls += 1
+        Dictionary.getObjects_andKeys_count_(self, values, keys, count)
+
+    def allKeys(self):
+        _CountingDictionary.calls += 1
+        return _Elements(list(self.items))
+
+    def allValues(self):
+        _CountingDictionary.calls += 1
+        return _Elements(list(self.items.values()))
+
+
+def test_benchmark_bulk_conversion():
+    objcd = _CountingDictionary({String('k{}'.format(i)): Number(i) for i in range(100000)})
+    _CountingDictionary.calls = 0
+    start = perf_counter()
+    keys, values = objchandler.dict_items(objcd)
+    bulk = perf_counter() - start, _CountingDictionary.calls
+
+    # The allKeys/allValues walk dict_items replaced
+    _CountingDictionary.calls = 0
+    start = perf_counter()
+    pairs = [{key: value} for key, value in zip(objcd.allKeys(), objcd.allValues())]
+    walk = perf_counter() - start, _CountingDictionary.calls
+
+    print('\n100k entries: bulk {:.3f}s {} calls, allKeys/allValues {:.3f}s {} calls'.format(*(bulk + walk)))
+    assert len(keys) == len(values) == len(pairs) == 100000
+    assert bulk[1] == 3
+    assert walk[1] == 200002
@@ -0,0 +1,83 @@
+import pytest
+import fakes
+from objc_tools import music
+from objc_tools.music import stats
+
+
+@pytest.fixture
+def songs_query(monkeypatch):
+    '''Points MPMediaQuery.songsQuery at a list of fake items and counts the queries'''
+    items = fakes.library(30)
+
+    class MPMediaQuery (object):
+        queries = 0
+
+        @staticmethod
+        def songsQuery():
+            MPMediaQuery.queries += 1
+            return fakes.Query(items)
+    monkeypatch.setattr(music, 'MPMediaQuery', MPMediaQuery)
+    return MPMediaQuery, items
+
+
+def test_top_totals_are_integers():
+    snap = stats._synthetic(1000)
+    for by in ('plays', 'skips', 'songs'):
+        for label, total in stats.top_artists(snap, by=by):
+            assert type(total) is int
+    assert all(type(total) is float for label, total in stats.top_artists(snap, by='time'))
+    with pytest.raises(ValueError):
+        stats.top_artists(snap, by='nope')
+
+
+def test_top_matches_a_python_count():
+    snap = music.LibrarySnapshot.from_items(fakes.library(30))
+    plays = {}
+    for item in fakes.library(30):
+        plays[item.values['artist']] = plays.get(item.values['artist'], 0) + item.values['playCount']
+    expected = sorted(plays.items(), key=lambda pair: -pair[1])[:3]
+    assert stats.top_artists(snap, n=3) == expected
+    assert dict(stats.top_genres(snap, by='songs')) == {'G0': 10, 'G1': 10, 'G2': 10}
+
+
+def test_snapshot_is_saved_and_reused(tmp_path, songs_query):
+    query, items = songs_query
+    path = str(tmp_path / 'stats.npz')
+    library = fakes.Library()
+    snap = stats.snapshot(path, library=library)
+    assert query.queries == 1 and len(snap) == 30
+    fakes.Item.calls = 0
+    again = stats.snapshot(path, library=library)
+    assert query.queries == 1 and fakes.Item.calls == 0
+    assert stats.top_artists(again) == stats.top_artists(snap)
+    assert list(again['artist']) == list(snap['artist'])
+
+
+def test_snapshot_is_rebuilt_when_the_library_changes(tmp_path, songs_query):
+    query, items = songs_query
+    path = str(tmp_path / 'stats.npz')
+    library = fakes.Library()
+    stats.snapshot(path, library=library)
+    items.append(fakes.Item(30))
+    library.modified = 2.0
+    assert len(stats.snapshot(path, library=library)) == 31
+    assert query.queries == 2
+    assert len(stats.snapshot(path, library=library)) == 31
+    assert query.queries == 2
+    stats.snapshot(path, refresh=True, library=library)
+    assert query.queries == 3
+
+
+def test_snapshot_of_a_query_is_not_saved(tmp_path, songs_query):
+    path = tmp_path / 'stats.npz'
+    snap = stats.snapshot(str(path), query=lambda: fakes.Query(fakes.library(4)), library=fakes.Library())
+    assert len(snap) == 4
+    assert not path.exists()
+
+
+def test_snapshot_save_keeps_meta(tmp_path):
+    path = str(tmp_path / 'stats.npz')
+    music.LibrarySnapshot.from_items(fakes.library(3)).save(path, modified=12.5, source='songs')
+    snap, meta = music.LibrarySnapshot.load(path)
+    assert meta == {'modified': 12.5, 'source': 'songs'}
+    assert len(snap) == 3
@@ -0,0 +1,95 @@
+import ctypes
+import gc
+import os
+import time
+import tracemalloc
+from base64 import b64encode, decodebytes
+from io import BytesIO
+import pytest
+from objc_tools import ui_image
+
+
+class _Data (object):
+    '''An NSData backed by a ctypes buffer'''
+    def __init__(self, data):
+        self.buffer = ctypes.create_string_buffer(data, len(data))
+
+    def length(self):
+        return len(self.buffer)
+
+    def bytes(self):
+        return ctypes.addressof(self.buffer)
+
+    def base64EncodedString(self):
+        return _String(b64encode(self.buffer.raw))
+
+
+class _String (object):
+    def __init__(self, value):
+        self.value = value
+
+    def cString(self):
+        # Copied out of the NSString like objc_util does
+        return bytes(self.value)
+
+
+@pytest.fixture
+def png_rep(monkeypatch):
+    # The fake images are the PNG bytes themselves
+    monkeypatch.setattr(ui_image, 'png_rep', _Data)
+
+
+def test_nsdata_view_reads_in_place():
+    data = _Data(b'hello')
+    view = ui_image.nsdata_view(data)
+    ctypes.memmove(data.bytes(), b'j', 1)
+    assert bytes(view) == b'jello'
+    assert bytes(ui_image.nsdata_view(_Data(b''))) == b''
+
+
+def test_view_keeps_the_data_alive(png_rep):
+    view = ui_image.png_view(b'hello')
+    gc.collect()
+    assert bytes(view) == b'hello'
+
+
+def test_png_buffers_keep_their_order(png_rep):
+    images = [bytes([i]) * (i + 1) for i in range(20)]
+    assert [buffer.getvalue() for buffer in ui_image.png_buffers(images)] == images
+
+
+def _base64_buffer(data):
+    # png_buffer before the zero-copy path
+    return BytesIO(decodebytes(data.base64EncodedString().cString()))
+
+
+def _measure(func, data, runs=5):
+    """Returns the best wall time and the peak bytes allocated by copies while func runs"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del result
+    tracemalloc.start()
+    result = func(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def test_benchmark_png_copies():
+    png = os.urandom(8 * 1024 * 1024)
+    data = _Data(png)
+    old_time, old_bytes, old = _measure(_base64_buffer, data)
+    buffer_time, buffer_bytes, buffer = _measure(lambda data: BytesIO(ui_image.nsdata_view(data)), data)
+    view_time, view_bytes, view = _measure(ui_image.nsdata_view, data)
+    print('\n8 MB PNG, time and peak copies: base64 path {:.1f} ms {:.1f} MB, png_buffer {:.1f} ms {:.1f} MB, '
+          'png_view {:.3f} ms {:.0f} KB'.format(old_time * 1e3, old_bytes / 2 ** 20, buffer_time * 1e3,
+                                               buffer_bytes / 2 ** 20, view_time * 1e3, view_bytes / 1e3))
+    assert old.getvalue() == buffer.getvalue() == bytes(view) == png
+    # base64 string, its copy and the decoded bytes before BytesIO copies them again
+    assert old_bytes > 3 * len(png)
+    assert buffer_bytes < 1.2 * len(png)
+    assert view_bytes < 64 * 1024